@@ -0,0 +1,93 @@
+"""
+Compares the `(supply_symbol = :x OR borrow_symbol = :x)` filter with the UNION ALL
+plan built by `src.database.symbol_union` on a synthetic position table.
+
+    python -m benchmarks.union_vs_or [--rows 2000000] [--repeat 5]
+
+Creates a TEMP table shaped like quant__kamino_user_position_split (dropped with the
+session), indexes it like `src.migrations`, and reports EXPLAIN ANALYZE execution
+times and the top plan nodes of both forms. Set BENCH_DATABASE_URL to point it at a
+scratch database; defaults to the app's database URL.
+"""
+import os
+import json
+import argparse
+import statistics
+from sqlalchemy import create_engine, text
+from src.database import get_db_url, symbol_union
+
+TABLE = "bench_position_split"
+SYMBOLS = ["PYUSD", "USDC", "USDT", "SOL", "JitoSOL", "mSOL", "JLP", "cbBTC", "JUP", "syrupUSDC"]
+MARKETS = ["Main", "JLP", "Maple"]
+SELECT = "obligation_id, supply_symbol, supply_value, borrow_symbol, borrow_value"
+WHERE = 'lending_market_name = :market_name AND "timestamp" = :timestamp'
+
+def symbol_or(select: str, where: str, symbol_param: str = "asset_symbol", table: str = TABLE) -> str:
+    return f"""
+    SELECT {select}
+    FROM {table}
+    WHERE {where}
+      AND (supply_symbol = :{symbol_param} OR borrow_symbol = :{symbol_param})
+    """
+
+def create_table(conn, rows: int, snapshots: int):
+    conn.execute(text(f"""
+        CREATE TEMP TABLE {TABLE} AS
+        SELECT
+            (ARRAY{MARKETS})[1 + (g % {len(MARKETS)})] AS lending_market_name,
+            'obl_' || (g % (:rows / :snapshots)) AS obligation_id,
+            1700000000 + (g / (:rows / :snapshots)) * 600 AS "timestamp",
+            (ARRAY{SYMBOLS})[1 + floor(power(random(), 2) * {len(SYMBOLS)})::int] AS supply_symbol,
+            (random() * 1e6)::double precision AS supply_value,
+            (ARRAY{SYMBOLS})[1 + floor(power(random(), 2) * {len(SYMBOLS)})::int] AS borrow_symbol,
+            (random() * 5e5)::double precision AS borrow_value,
+            0.8::double precision AS supply_lt,
+            1.0::double precision AS borrow_factor
+        FROM generate_series(0, :rows - 1) AS g
+    """), {"rows": rows, "snapshots": snapshots})
+    conn.execute(text(f'CREATE INDEX ON {TABLE} (lending_market_name, "timestamp", supply_symbol)'))
+    conn.execute(text(f'CREATE INDEX ON {TABLE} (lending_market_name, "timestamp", borrow_symbol)'))
+    conn.execute(text(f"ANALYZE {TABLE}"))
+
+def explain(conn, query: str, params: dict) -> tuple:
+    """(execution ms, top plan node type, rows) from EXPLAIN (ANALYZE, FORMAT JSON)."""
+    plan = conn.execute(text("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query), params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    top = plan[0]
+    node = top["Plan"]
+    scans = []
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        if "Scan" in n["Node Type"]:
+            scans.append(n["Node Type"])
+        stack.extend(n.get("Plans", []))
+    return top["Execution Time"], ", ".join(sorted(set(scans))), node["Actual Rows"]
+
+def main():
+    parser = argparse.ArgumentParser(description="OR filter vs UNION ALL on a synthetic position table")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--snapshots", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(os.getenv("BENCH_DATABASE_URL") or get_db_url())
+    with engine.connect() as conn:
+        print(f"Building {TABLE} with {args.rows:,} rows over {args.snapshots} snapshots...")
+        create_table(conn, args.rows, args.snapshots)
+        ts = conn.execute(text(f'SELECT max("timestamp") FROM {TABLE}')).scalar()
+
+        print(f"{'symbol':10} {'OR ms':>9} {'UNION ms':>9} {'rows':>8}  scans (OR | UNION)")
+        for symbol in ["PYUSD", "USDC", "SOL"]:
+            params = {"market_name": "Main", "timestamp": ts, "asset_symbol": symbol}
+            results = {}
+            for label, query in [("or", symbol_or(SELECT, WHERE)), ("union", symbol_union(SELECT, WHERE, table=TABLE))]:
+                runs = [explain(conn, query, params) for _ in range(args.repeat)]
+                results[label] = (statistics.median(r[0] for r in runs), runs[0][1], runs[0][2])
+            (or_ms, or_scans, or_rows), (un_ms, un_scans, un_rows) = results["or"], results["union"]
+            flag = "" if or_rows == un_rows else "  ROW COUNT MISMATCH"
+            print(f"{symbol:10} {or_ms:9.2f} {un_ms:9.2f} {un_rows:8,}  {or_scans} | {un_scans}{flag}")
+
+if __name__ == "__main__":
+    main()
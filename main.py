@@ -1,4 +1,5 @@
 import streamlit as st
+from datetime import datetime
 
 # --- Content replicated from app.py ---
 st.set_page_config(layout="wide")
@@ -12,7 +13,19 @@ from pages.usdc_asset import usdc_asset
 from pages.leverage import leverage_page
 from pages.liquidation_risk import liquidation_risk
 from pages.position_at_risk import position_at_risk
+from pages.monte_carlo_var import monte_carlo_var
 from pages.user_positions import user_positions
+from pages.query_stats import query_stats_page
+from pages.utils.cache_warmer import CacheWarmer
+
+@st.cache_resource
+def start_cache_warmer():
+    # One warmer per server process, shared by all sessions
+    warmer = CacheWarmer()
+    warmer.start()
+    return warmer
+
+cache_warmer = start_cache_warmer()
 
 earn_overview_page = st.Page(
     earn_overview,
@@ -57,6 +70,12 @@ position_at_risk_page = st.Page(
     icon=":material/trending_down:",
 )
 
+monte_carlo_var_page = st.Page(
+    monte_carlo_var,
+    title="Liquidation VaR",
+    icon=":material/casino:",
+)
+
 main_market_page = st.Page(
     main_market,
     title="Main Market",
@@ -81,6 +100,12 @@ user_positions_page = st.Page(
     icon=":material/list:",
 )
 
+query_stats_page_obj = st.Page(
+    query_stats_page,
+    title="Query Performance",
+    icon=":material/speed:",
+)
+
 pg = st.navigation(
     {
         "Earn": [earn_overview_page],
@@ -91,11 +116,20 @@ pg = st.navigation(
             maple_market_page,
         ],
         "Assets": [pyusd_asset_page, usdc_asset_page],
-        "Risk": [leverage_page_obj, liquidation_risk_page, position_at_risk_page],
+        "Risk": [leverage_page_obj, liquidation_risk_page, position_at_risk_page, monte_carlo_var_page],
         "Positions": [user_positions_page],
+        "Admin": [query_stats_page_obj],
     }
 )
 
+warm_status = cache_warmer.status()
+if warm_status["last_run_at"]:
+    st.sidebar.caption(
+        f"Caches warmed for snapshot `{warm_status['last_timestamp']}` "
+        f"at {datetime.fromtimestamp(warm_status['last_run_at']):%H:%M:%S} "
+        f"in {warm_status['last_duration']:.1f}s"
+    )
+
 pg.run()
 
 # --- Login Implementation (Commented Out) ---
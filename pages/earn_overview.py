@@ -5,6 +5,9 @@ import plotly.express as px
 from datetime import datetime, timedelta, timezone
 from pages.mappings.markets import get_market_name, PYUSD_RESERVE_MAPPING
 from pages.utils.ui_components import render_delta_bubbles
+from src.time_window import snapped_window_strings
+from src.http_client import get_json
+from src.asof import asof_lookup, asof_value
 
 
 def earn_overview():
@@ -14,9 +17,7 @@ def earn_overview():
         "A2wsxhA7pF4B2UKVfXocb6TAAP9ipfPJam6oMKgDE5BK"
     )
     NOW = datetime.now(timezone.utc)
-    START = NOW - timedelta(days=31)
-    end_str = NOW.isoformat(timespec="milliseconds").replace("+00:00", "Z")
-    start_str = START.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+    start_str, end_str = snapped_window_strings(31, now=NOW)
 
     @st.cache_data(ttl=600, show_spinner=False)
     def fetch_allocation_transactions(vault_id: str):
@@ -25,16 +26,11 @@ def earn_overview():
             + vault_id
             + "/allocation-transactions"
         )
-        last_err = None
-        for attempt in range(3):
-            try:
-                r = requests.get(url, timeout=(10, 60))
-                r.raise_for_status()
-                return r.json()
-            except requests.RequestException as e:
-                last_err = e
-        st.warning(f"Failed to fetch allocation transactions after 3 attempts: {last_err}")
-        return []
+        try:
+            return get_json(url, timeout=(10, 60))
+        except requests.RequestException as e:
+            st.warning(f"Failed to fetch allocation transactions: {e}")
+            return []
 
     @st.cache_data(ttl=600, show_spinner=False)
     def fetch_metrics_history(vault_id: str, start: str, end: str):
@@ -47,16 +43,11 @@ def earn_overview():
             + "&end="
             + end
         )
-        last_err = None
-        for attempt in range(3):
-            try:
-                r = requests.get(url, timeout=(10, 60))
-                r.raise_for_status()
-                return r.json()
-            except requests.RequestException as e:
-                last_err = e
-        st.warning(f"Failed to fetch metrics history after 3 attempts: {last_err}")
-        return []
+        try:
+            return get_json(url, timeout=(10, 60))
+        except requests.RequestException as e:
+            st.warning(f"Failed to fetch metrics history: {e}")
+            return []
 
     st.divider()
 
@@ -102,12 +93,10 @@ def earn_overview():
 
             latest = mdf.sort_values("timestamp").tail(1)
             if not latest.empty:
-                last_t = latest.iloc[0]["timestamp"]
+                snap = asof_lookup(mdf, ["tvl", "apyActual", "apyFarmRewards", "apyReservesIncentives", "apyIncentives"])
 
                 def value_at(days: int, col: str):
-                    target = last_t - timedelta(days=days)
-                    s = mdf.loc[mdf["timestamp"] <= target, col]
-                    return s.iloc[-1] if len(s) else None
+                    return asof_value(snap, days, col)
 
                 current_tvl = float(latest.iloc[0]["tvl"]) if pd.notnull(
                     latest.iloc[0]["tvl"]
@@ -124,15 +113,14 @@ def earn_overview():
                 )
 
                 def apy_at(days: int):
-                    target = last_t - timedelta(days=days)
-                    row = mdf.loc[mdf["timestamp"] <= target].tail(1)
-                    if row.empty:
+                    row = snap.get(days)
+                    if row is None:
                         return None
                     return (
-                        row.iloc[0]["apyActual"]
-                        + row.iloc[0]["apyFarmRewards"]
-                        + row.iloc[0]["apyReservesIncentives"]
-                        + row.iloc[0]["apyIncentives"]
+                        row["apyActual"]
+                        + row["apyFarmRewards"]
+                        + row["apyReservesIncentives"]
+                        + row["apyIncentives"]
                     )
 
                 c1, c2, c3, c4 = st.columns(4)
@@ -172,16 +160,16 @@ def earn_overview():
                     if rm.empty:
                         continue
                     last_row = rm.tail(1).iloc[0]
-                    last_t_m = last_row["timestamp"]
                     alloc_curr = float(last_row["allocation"]) if pd.notnull(last_row["allocation"]) else None
                     ratio_curr = float(last_row["allocationRatio"]) if pd.notnull(last_row["allocationRatio"]) else None
+                    snap_m = asof_lookup(rm, ["allocation", "allocationRatio"])
                     def prev_vals(days: int):
-                        row = rm.loc[rm["timestamp"] <= last_t_m - timedelta(days=days)].tail(1)
-                        if row.empty:
+                        row = snap_m.get(days)
+                        if row is None:
                             return None, None
                         return (
-                            float(row.iloc[0]["allocation"]) if pd.notnull(row.iloc[0]["allocation"]) else None,
-                            float(row.iloc[0]["allocationRatio"]) if pd.notnull(row.iloc[0]["allocationRatio"]) else None,
+                            float(row["allocation"]) if pd.notnull(row["allocation"]) else None,
+                            float(row["allocationRatio"]) if pd.notnull(row["allocationRatio"]) else None,
                         )
                     amt_1d, pct_1d = prev_vals(1)
                     amt_7d, pct_7d = prev_vals(7)
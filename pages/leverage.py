@@ -2,29 +2,43 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from src.database import (
+    run_concurrently,
     get_max_position_timestamp, 
     get_leverage_borrowed,
-    get_leverage_collateral,
-    get_historic_leverage_where_asset_is_collateral,
-    get_historic_leverage_where_asset_is_borrowed
+    get_leverage_collateral
 )
+from src.leverage_rollups import update_rollups, pick_resolution, get_historic_leverage
+from src.cache import persistent_cache, cache_tag, refresh_caches, SNAPSHOT_TAG
 
+DEFAULT_DEBT_THRESHOLD = 100000
+
+@cache_tag(SNAPSHOT_TAG)
 @st.cache_data(ttl=300)
+@persistent_cache(ttl=300, version=2)
 def load_leverage_data(max_ts, market, asset, debt_threshold):
-    df_borrowed = get_leverage_borrowed(max_ts, market, asset, debt_threshold)
-    df_collateral = get_leverage_collateral(max_ts, market, asset, debt_threshold)
-    df_hist_collateral = get_historic_leverage_where_asset_is_collateral(market, asset, debt_threshold)
-    df_hist_borrowed = get_historic_leverage_where_asset_is_borrowed(market, asset, debt_threshold)
-    return df_borrowed, df_collateral, df_hist_collateral, df_hist_borrowed
+    # The rollup delta sync is the only DB round trip left for the history, so it runs
+    # side by side with the snapshot load behind the two tables
+    df_borrowed, df_collateral, synced = run_concurrently([
+        (get_leverage_borrowed, max_ts, market, asset, debt_threshold),
+        (get_leverage_collateral, max_ts, market, asset, debt_threshold),
+        (update_rollups, market),
+    ])
+    if not synced:
+        # Raising keeps stale rollups from being cached (in memory and on disk) as this snapshot's history
+        raise RuntimeError(f"leverage rollups for {market} could not be brought up to date")
+    # History comes from the hourly/daily rollups, at the finest resolution that fits the chart.
+    # Both sides are in-memory slices of the same stored rollup, so they are read sequentially.
+    resolution = pick_resolution(market)
+    df_hist_collateral = get_historic_leverage(market, asset, debt_threshold, "collateral", resolution)
+    df_hist_borrowed = get_historic_leverage(market, asset, debt_threshold, "borrowed", resolution)
+    return df_borrowed, df_collateral, df_hist_collateral, df_hist_borrowed, resolution
 
 def leverage_page():
     c_header, c_refresh = st.columns([0.85, 0.15])
     with c_header:
         st.title("Leverage Analysis", help="Examines the leverage usage for a specific asset. High leverage indicates higher sensitivity to price changes.")
     with c_refresh:
-        if st.button("Refresh", key="refresh_leverage"):
-            st.cache_data.clear()
-            st.rerun()
+        refresh = st.button("Refresh", key="refresh_leverage")
             
     st.write("Analyze leverage positions for specific markets and assets.")
 
@@ -52,7 +66,7 @@ def leverage_page():
             debt_threshold = st.number_input(
                 "Debt Threshold ($)",
                 min_value=0,
-                value=100000,
+                value=DEFAULT_DEBT_THRESHOLD,
                 step=1000,
                 help="Filter out small positions. Only positions with debt exceeding this value are included."
             )
@@ -61,10 +75,17 @@ def leverage_page():
     with st.container(border=True):
         with st.spinner("Loading leverage data..."):
             max_ts = get_max_position_timestamp()
+            if refresh:
+                # Drops caches whose source moved and re-runs only the entry behind this view
+                refresh_caches({SNAPSHOT_TAG: max_ts}, calls=((load_leverage_data, max_ts, market, asset, debt_threshold),))
             
             if max_ts:
                 # Use a cached function to load data, passing timestamp to ensure freshness
-                df_borrowed, df_collateral, df_hist_collateral, df_hist_borrowed = load_leverage_data(max_ts, market, asset, debt_threshold)
+                try:
+                    df_borrowed, df_collateral, df_hist_collateral, df_hist_borrowed, resolution = load_leverage_data(max_ts, market, asset, debt_threshold)
+                except RuntimeError as e:
+                    st.error(f"Could not load leverage data: {e}. Try again shortly.")
+                    return
                 
                 st.markdown(f"**Data Timestamp:** {pd.to_datetime(max_ts, unit='s')}")
 
@@ -105,6 +126,7 @@ def leverage_page():
                 
                 # Historic Leverage Analysis
                 st.subheader("Historic Leverage Analysis", help="Trends of Loan-to-Value (LTV) ratios over time for positions involving the selected asset.")
+                st.caption(f"{resolution.capitalize()} buckets: LTV is total debt over total collateral in each bucket; the debt threshold applies to the average debt per snapshot.")
                 
                 st.subheader(f"Pairs where {asset} is Collateral (LTV over time)", help=f"Historical view of LTV ratios for loans backed by {asset}. Higher LTV indicates higher risk.")
                 if not df_hist_collateral.empty:
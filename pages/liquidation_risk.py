@@ -1,22 +1,59 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
-from src.database import get_max_position_timestamp, get_liquidation_risk_data
+from src.database import get_max_position_timestamp, get_liquidation_risk_data, get_market_positions
 from src.api import fetch_liquidation_history
 from pages.mappings.markets import get_market_name, PYUSD_RESERVE_MAPPING
+from src.cache import persistent_cache, cache_tag, refresh_caches, clear_entry, api_token, API_TAG, SNAPSHOT_TAG
+from src.shock_curves import build_liquidation_curves
+from src.stress import stress_grid, sensitivity_matrix
+from src.cascade import cascade_grid, CLOSE_FACTOR, LIQUIDATION_BONUS, DEPTH_USD
 
+@cache_tag(SNAPSHOT_TAG)
 @st.cache_data(ttl=300)
+@persistent_cache(ttl=300)
 def load_data(timestamp, market, asset):
     return get_liquidation_risk_data(timestamp, market, asset)
 
+@cache_tag(SNAPSHOT_TAG)
+@st.cache_resource(ttl=300, max_entries=32, show_spinner=False)
+def load_shock_curves(timestamp, market, asset):
+    # Built once per snapshot and shared read-only by every session; symbol picks and
+    # toggles only merge the precomputed curves
+    return build_liquidation_curves(load_data(timestamp, market, asset))
+
+@cache_tag(SNAPSHOT_TAG)
+@st.cache_data(ttl=300, show_spinner=False)
+@persistent_cache(ttl=300)
+def load_stress_grid(timestamp, market, supply_symbols, borrow_symbols):
+    # Every position of the market; the symbol selections (sorted tuples, None = all)
+    # only decide which positions feel the collateral and the debt shock
+    supply = list(supply_symbols) if supply_symbols else None
+    borrow = list(borrow_symbols) if borrow_symbols else None
+    return stress_grid(get_market_positions(timestamp, market), supply, borrow)
+
+@cache_tag(SNAPSHOT_TAG)
+@st.cache_data(ttl=300)
+@persistent_cache(ttl=300)
+def load_sensitivity_matrix(timestamp, market):
+    # Every symbol of the market, not just positions involving the filtered asset
+    return sensitivity_matrix(get_market_positions(timestamp, market))
+
+@cache_tag(SNAPSHOT_TAG)
+@st.cache_data(ttl=300, show_spinner=False)
+@persistent_cache(ttl=300)
+def load_cascade(timestamp, market, asset, impact, depth, close_factor, liquidation_bonus):
+    # Every collateral symbol x initial shock in one vectorized run
+    return cascade_grid(load_data(timestamp, market, asset), impact=impact, depth=depth,
+                        close_factor=close_factor, liquidation_bonus=liquidation_bonus)
+
 def liquidation_risk():
     c_header, c_refresh = st.columns([0.85, 0.15])
     with c_header:
         st.header("Liquidation Risk", help="Analyzes the solvency of positions under price shock scenarios. Helps identify potential liquidations if asset prices move significantly.")
     with c_refresh:
-        if st.button("Refresh", key="refresh_liquidation_risk"):
-            st.cache_data.clear()
-            st.rerun()
+        refresh = st.button("Refresh", key="refresh_liquidation_risk")
 
     # Top Level Filters
     c1, c2 = st.columns(2)
@@ -31,8 +68,16 @@ def liquidation_risk():
         if ts is None:
             st.error("Could not fetch timestamp.")
             return
+        if refresh:
+            # Drops caches whose source moved and re-runs only the entries behind this view;
+            # the historical liquidation data is left to its API tag
+            refresh_caches(
+                {SNAPSHOT_TAG: ts, API_TAG: api_token()},
+                calls=((load_data, ts, market, asset), (load_shock_curves, ts, market, asset), (load_sensitivity_matrix, ts, market)),
+            )
         
         df = load_data(ts, market, asset)
+        supply_curves, borrow_curves = load_shock_curves(ts, market, asset)
 
     if df.empty:
         st.warning("No data available for the selected parameters.")
@@ -44,7 +89,7 @@ def liquidation_risk():
     st.subheader("Supply Side Risk Analysis", help="Analyzes the potential impact of a drop in collateral asset prices. Shows the cumulative value of collateral and debt that would be at risk of liquidation at different price shock levels.")
     st.markdown("Filter by Supply Symbol, analyze impact of Collateral Price Shock.")
 
-    supply_symbols = sorted(df['supply_symbol'].unique())
+    supply_symbols = supply_curves.symbols
     selected_supply = st.multiselect(
         "Select Supply Symbols", 
         supply_symbols, 
@@ -55,28 +100,8 @@ def liquidation_risk():
     adjust_supply = st.toggle("Adjust Collateral Value by Shock", value=False, help="If enabled, Collateral Value is reduced by the shock percentage (Supply Value * (1 - Shock)). This simulates the post-shock value of the collateral.")
 
     if selected_supply:
-        # Filter
-        df_supply = df[df['supply_symbol'].isin(selected_supply)].copy()
-        
-        # Drop rows with NaN shock values
-        df_supply = df_supply.dropna(subset=['collateral_liquidation_price_shock'])
-
-        # Round shock to 4 decimal places for aggregation (0.01% precision) to reduce points and aggregate
-        df_supply['shock_rounded'] = df_supply['collateral_liquidation_price_shock'].round(4)
-        
-        # Apply adjustment if toggled
-        if adjust_supply:
-            df_supply['supply_value'] = df_supply['supply_value'] * (1 - df_supply['shock_rounded'])
-
-        # Aggregate by shock bucket
-        df_agg_supply = df_supply.groupby('shock_rounded')[['supply_value', 'borrow_value']].sum().sort_index()
-        
-        # Cumulative Sums on aggregated data
-        df_agg_supply['cumulative_borrow_value'] = df_agg_supply['borrow_value'].cumsum()
-        df_agg_supply['cumulative_supply_value'] = df_agg_supply['supply_value'].cumsum()
-        
-        # Reset index to make shock_rounded a column for plotting
-        df_agg_supply = df_agg_supply.reset_index()
+        # Cumulative collateral/debt per rounded shock (0.01% buckets), merged from the per-symbol curves
+        df_agg_supply = supply_curves.curve(selected_supply, adjust=adjust_supply)
 
         # Charts
         fig1 = px.line(
@@ -119,7 +144,7 @@ def liquidation_risk():
     st.subheader("Borrow Side Risk Analysis", help="Analyzes the potential impact of an increase in borrowed asset prices. Shows the cumulative value of collateral and debt that would be at risk of liquidation at different price shock levels.")
     st.markdown("Filter by Borrow Symbol, analyze impact of Borrow Price Shock.")
 
-    borrow_symbols = sorted(df['borrow_symbol'].unique())
+    borrow_symbols = borrow_curves.symbols
     selected_borrow = st.multiselect(
         "Select Borrow Symbols", 
         borrow_symbols, 
@@ -130,28 +155,7 @@ def liquidation_risk():
     adjust_borrow = st.toggle("Adjust Debt Value by Shock", value=False, help="If enabled, Debt Value is increased by the shock percentage (Borrow Value * (1 + Shock)). This simulates the post-shock value of the debt.")
 
     if selected_borrow:
-        # Filter
-        df_borrow = df[df['borrow_symbol'].isin(selected_borrow)].copy()
-        
-        # Drop rows with NaN shock values
-        df_borrow = df_borrow.dropna(subset=['borrow_liquidation_price_shock'])
-
-        # Round shock to 4 decimal places for aggregation
-        df_borrow['shock_rounded'] = df_borrow['borrow_liquidation_price_shock'].round(4)
-        
-        # Apply adjustment if toggled
-        if adjust_borrow:
-            df_borrow['borrow_value'] = df_borrow['borrow_value'] * (1 + df_borrow['shock_rounded'])
-
-        # Aggregate by shock bucket
-        df_agg_borrow = df_borrow.groupby('shock_rounded')[['supply_value', 'borrow_value']].sum().sort_index()
-        
-        # Cumulative Sums on aggregated data
-        df_agg_borrow['cumulative_borrow_value'] = df_agg_borrow['borrow_value'].cumsum()
-        df_agg_borrow['cumulative_supply_value'] = df_agg_borrow['supply_value'].cumsum()
-        
-        # Reset index
-        df_agg_borrow = df_agg_borrow.reset_index()
+        df_agg_borrow = borrow_curves.curve(selected_borrow, adjust=adjust_borrow)
 
         # Charts
         fig2 = px.line(
@@ -189,6 +193,115 @@ def liquidation_risk():
         st.info("Please select at least one Borrow Symbol.")
 
     st.divider()
+
+    # Row 3: Joint Stress Surface
+    st.subheader("Joint Price Shock Stress", help="Liquidatable value when collateral prices drop and debt prices rise at the same time. A position is liquidatable once its health factor times (1 - collateral shock) / (1 + debt shock) falls to 1 or below.")
+    st.markdown("Covers every position in the market. Collateral shock applies to the selected Supply Symbols, debt shock to the selected Borrow Symbols (all positions if none are selected).")
+
+    stress_metric = st.radio("Metric", ["Liquidatable Debt", "Liquidatable Collateral"], horizontal=True, key="stress_metric")
+    stress_args = (ts, market, tuple(sorted(selected_supply)) or None, tuple(sorted(selected_borrow)) or None)
+    if refresh:
+        clear_entry(load_stress_grid, *stress_args)
+    grid = load_stress_grid(*stress_args)
+    fig3 = px.imshow(
+        grid["debt"] if stress_metric == "Liquidatable Debt" else grid["collateral"],
+        x=grid["collateral_shocks"],
+        y=grid["debt_shocks"],
+        origin="lower",
+        aspect="auto",
+        color_continuous_scale="Reds",
+        labels={"x": "Collateral Price Shock", "y": "Debt Price Shock", "color": stress_metric},
+        title=f"{stress_metric} under Joint Shocks",
+    )
+    fig3.update_layout(xaxis_tickformat=".0%", yaxis_tickformat=".0%")
+    st.plotly_chart(fig3, use_container_width=True)
+
+    st.divider()
+
+    # Row 4: Per-Asset Sensitivity
+    st.subheader("Per-Asset Shock Sensitivity", help="Debt that becomes liquidatable when a single asset's oracle price moves while all other prices stay unchanged. A price drop hurts positions using the asset as collateral; a price rise hurts positions borrowing it. Covers every position in the market.")
+    sensitivity = load_sensitivity_matrix(ts, market)
+    sensitivity = sensitivity[(sensitivity > 0).any(axis=1)]
+    if sensitivity.empty:
+        st.info("No position becomes liquidatable within the tested price moves.")
+    else:
+        fig4 = px.imshow(
+            sensitivity.to_numpy(),
+            x=[f"{s:+.0%}" for s in sensitivity.columns],
+            y=list(sensitivity.index),
+            aspect="auto",
+            color_continuous_scale="Reds",
+            labels={"x": "Price Move", "y": "Asset", "color": "Newly Liquidatable Debt"},
+            title=f"Newly Liquidatable Debt by Asset Price Move ({market} Market)",
+        )
+        fig4.update_layout(height=max(400, 24 * len(sensitivity)))
+        st.plotly_chart(fig4, use_container_width=True)
+
+    st.divider()
+
+    # Row 5: Liquidation Cascades
+    st.subheader("Liquidation Cascade", help="Liquidators sell seized collateral, which pushes its price down further and can liquidate more positions. The cascade is iterated until no further position becomes liquidatable. Each liquidation seizes close factor x (1 + bonus) of the position's debt in collateral.")
+    c_model, c_depth, c_cf, c_bonus = st.columns(4)
+    with c_model:
+        impact = st.radio("Price Impact", ["linear", "sqrt"], format_func=lambda m: "Linear" if m == "linear" else "Square Root", horizontal=True, key="cascade_impact")
+    with c_depth:
+        depth = st.number_input("Depth (USD per 1% move)", min_value=10_000.0, value=DEPTH_USD, step=100_000.0, format="%.0f", key="cascade_depth")
+    with c_cf:
+        close_factor = st.number_input("Close Factor", min_value=0.01, max_value=1.0, value=CLOSE_FACTOR, step=0.05, key="cascade_close_factor")
+    with c_bonus:
+        bonus = st.number_input("Liquidation Bonus", min_value=0.0, max_value=0.5, value=LIQUIDATION_BONUS, step=0.01, key="cascade_bonus")
+
+    cascade_args = (ts, market, asset, impact, float(depth), float(close_factor), float(bonus))
+    if refresh:
+        clear_entry(load_cascade, *cascade_args)
+    cascade = load_cascade(*cascade_args)
+    if not cascade["symbols"]:
+        st.info("No collateral positions to simulate.")
+    else:
+        shocks = cascade["shocks"]
+        initial_shock = st.select_slider("Initial Collateral Price Shock", options=list(shocks), value=shocks[min(10, len(shocks) - 1)], format_func=lambda s: f"{s:.0%}", key="cascade_shock")
+        j = int(np.searchsorted(shocks, initial_shock))
+        summary = pd.DataFrame({
+            "Collateral": cascade["symbols"],
+            "Initial Liquidatable Debt": cascade["initial_debt"][:, j],
+            "Cascade Liquidatable Debt": cascade["final_debt"][:, j],
+            "Final Price Shock": cascade["final_shock"][:, j] * 100,
+            "Rounds": cascade["iterations"][:, j],
+            "Converged": cascade["converged"][:, j],
+        })
+        summary = summary[summary["Cascade Liquidatable Debt"] > 0].sort_values("Cascade Liquidatable Debt", ascending=False)
+        if not summary["Converged"].all():
+            st.warning("Some cascades hit the iteration limit before reaching a fixed point; their figures are a lower bound.")
+        st.dataframe(
+            summary,
+            column_config={
+                "Initial Liquidatable Debt": st.column_config.NumberColumn(format="$%.0f"),
+                "Cascade Liquidatable Debt": st.column_config.NumberColumn(format="$%.0f"),
+                "Final Price Shock": st.column_config.NumberColumn(format="%.1f%%"),
+            },
+            hide_index=True,
+            use_container_width=True,
+        )
+
+        # Curves for the selected supply symbols, with and without feedback
+        rows = [i for i, s in enumerate(cascade["symbols"]) if s in (selected_supply or [])]
+        if rows:
+            df_cascade = pd.DataFrame({
+                "shock": shocks,
+                "Without Feedback": cascade["initial_debt"][rows].sum(axis=0),
+                "With Feedback": cascade["final_debt"][rows].sum(axis=0),
+            })
+            fig5 = px.line(
+                df_cascade,
+                x="shock",
+                y=["Without Feedback", "With Feedback"],
+                title="Liquidatable Debt vs Initial Collateral Shock (selected Supply Symbols)",
+                labels={"shock": "Initial Collateral Price Shock", "value": "Liquidatable Debt", "variable": ""},
+            )
+            fig5.update_layout(xaxis_tickformat=".0%")
+            st.plotly_chart(fig5, use_container_width=True)
+
+    st.divider()
     
     with st.expander("Historical Liquidation Data (PYUSD)", expanded=False):
         st.caption("Data source: Sentora DeFi Risk API")
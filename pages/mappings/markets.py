@@ -1,11 +1,14 @@
-import requests
+import logging
 import streamlit as st
+from src.http_client import get_json
+from src.cache import persistent_cache, cache_tag, API_TAG
 
 # Centralized Market Configuration
 # Single Source of Truth for all market addresses and names
 MARKET_CONFIGS = {
     "MAIN": {
         "name": "Main Market",
+        "db_name": "Main",  # lending_market_name in quant__kamino_user_position_split
         "lending_market": "7u3HeHxYDLhnCoErrtycNokbQYbWGzLs6JSDqGAv5PfF",
         "reserves": {
             "PYUSD": "2gc9Dm1eB6UgVYFBUN9bWks6Kes9PbWSaPaa9DqyvEiN",
@@ -16,6 +19,7 @@ MARKET_CONFIGS = {
     },
     "JLP": {
         "name": "JLP Market",
+        "db_name": "JLP",
         "lending_market": "DxXdAyU3kCjnyggvHmY5nAwg5cRbbmdyX3npfDMjjMek",
         "reserves": {
             "PYUSD": "FswUCVjvfAuzHCgPDF95eLKscGsLHyJmD6hzkhq26CLe",
@@ -25,6 +29,7 @@ MARKET_CONFIGS = {
     },
     "MAPLE": {
         "name": "Maple Market",
+        "db_name": "Maple",
         "lending_market": "6WEGfej9B9wjxRs6t4BYpb9iCXd8CpTpJ8fVSNzHCC5y",
         "reserves": {
             "PYUSD": "92qeAka3ZzCGPfJriDXrE7tiNqfATVCAM6ZjjctR3TrS",
@@ -34,6 +39,9 @@ MARKET_CONFIGS = {
     }
 }
 
+# Assets analysed on the position-based (DB) pages
+POSITION_ASSETS = ["PYUSD", "USDC"]
+
 # Legacy mapping for compatibility (can be deprecated later)
 PYUSD_RESERVE_MAPPING = {
     cfg["reserves"]["PYUSD"]: cfg["lending_market"] 
@@ -42,18 +50,24 @@ PYUSD_RESERVE_MAPPING = {
 }
 
 
+def get_market_config(db_name: str) -> dict:
+    """Config of the market whose lending_market_name in the position table is `db_name`."""
+    return next(cfg for cfg in MARKET_CONFIGS.values() if cfg["db_name"] == db_name)
+
+
 URL = "https://cdn.kamino.finance/kamino_lend_config_v3.json"
+RESERVES_URL = "https://api.kamino.finance/kamino-market/{market}/reserves/metrics?env=mainnet-beta"
 TARGET = "KLend2g3cP87fffoy8q1mQqGKjrxjC8boSyAYavgmjD"
 
 PYUSD = "2b1kV6DkPAnxd5ixfnxCpjxmKwqjjaYmCZfHsFu24GXo"
 KMNO = "KMNo3nJsBXfcpJTVhZcXLW7RmTwTt4GVFE7suUBo9sS"
 
+@cache_tag(API_TAG)
 @st.cache_data(ttl=60 * 60, show_spinner=False)
+@persistent_cache(ttl=60 * 60)
 def get_market_name_map():
     try:
-        r = requests.get(URL, timeout=10)
-        r.raise_for_status()
-        data = r.json()
+        data = get_json(URL, timeout=10)
     except Exception:
         return {}
 
@@ -77,3 +91,31 @@ def get_market_name_map():
 
 def get_market_name(address: str) -> str:
     return get_market_name_map().get(address, address)
+
+
+@cache_tag(API_TAG)
+@st.cache_data(ttl=60 * 60, show_spinner=False)
+@persistent_cache(ttl=60 * 60)
+def get_market_reserves(lending_market: str) -> dict:
+    """{symbol: reserve address} for every reserve of a lending market, from the Kamino API."""
+    try:
+        data = get_json(RESERVES_URL.format(market=lending_market), timeout=10)
+    except Exception as e:
+        logging.error("Error fetching reserves of %s: %s", lending_market, str(e))
+        return {}
+
+    result = {}
+    for item in data if isinstance(data, list) else []:
+        if not isinstance(item, dict):
+            continue
+        symbol = item.get("liquidityToken") or item.get("symbol")
+        reserve = item.get("reserve") or item.get("address")
+        if symbol and reserve:
+            result.setdefault(symbol, reserve)
+    return result
+
+
+def get_all_market_reserves(db_name: str) -> dict:
+    """Full reserve list of a market, with the configured reserves taking precedence."""
+    cfg = get_market_config(db_name)
+    return {**get_market_reserves(cfg["lending_market"]), **cfg["reserves"]}
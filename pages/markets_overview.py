@@ -1,7 +1,8 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime, timedelta, timezone
-from pages.utils.market_utils import fetch_market_history
+from pages.utils.market_utils import fetch_market_frames, RESERVE_HISTORY_DAYS
+from src.time_window import snapped_window_strings
+from src.asof import asof_lookup, asof_value
 from pages.mappings.markets import MARKET_CONFIGS
 
 # Construct MARKETS list from configuration
@@ -17,55 +18,15 @@ MARKETS = [
     if "PYUSD" in cfg["reserves"]
 ]
 
-def process_market_data(history):
-    if not history:
+def process_market_data(df):
+    if df is None or df.empty:
         return None
-        
-    rows = []
-    for h in history:
-        ts = h.get("timestamp")
-        m = h.get("metrics", {})
-        rows.append({
-            "timestamp": ts,
-            "totalSupply": m.get("totalSupply"),
-            "totalBorrows": m.get("totalBorrows"),
-            "reserveBorrowLimit": m.get("reserveBorrowLimit"),
-            "reserveDepositLimit": m.get("reserveDepositLimit"),
-            "decimals": m.get("decimals")
-        })
-    
-    df = pd.DataFrame(rows)
-    if df.empty:
-        return None
-        
-    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce", utc=True)
-    
-    # Convert numeric columns
-    for c in ["totalSupply", "totalBorrows", "reserveBorrowLimit", "reserveDepositLimit"]:
-        df[c] = pd.to_numeric(df[c], errors="coerce")
-        
-    df["decimals"] = pd.to_numeric(df["decimals"], errors="coerce")
-    
-    # Scale values
-    latest_decimals = df["decimals"].iloc[-1]
-    scale = 10 ** (latest_decimals if pd.notnull(latest_decimals) else 6) # Default to 6 if missing
-    
-    for c in ["reserveBorrowLimit", "reserveDepositLimit"]:
-        df[c] = df[c] / scale
 
-    # Sort by timestamp
-    df = df.sort_values("timestamp")
-    
     latest = df.iloc[-1]
-    last_t = latest["timestamp"]
-    
+    snap = asof_lookup(df, ["totalSupply", "totalBorrows"])
+
     def get_val_at_days_ago(days, col):
-        target = last_t - timedelta(days=days)
-        # Find nearest row before or at target
-        sub = df.loc[df["timestamp"] <= target]
-        if not sub.empty:
-            return sub.iloc[-1][col]
-        return None
+        return asof_value(snap, days, col)
 
     metrics = {
         "supply": {
@@ -119,11 +80,16 @@ def format_change(current, past, is_percent=False):
 def markets_overview():
     st.title("Markets Overview", help="High-level summary of all Kamino markets supported in this dashboard.")
     
-    # Prepare dates for API fetch
-    NOW = datetime.now(timezone.utc)
-    START = NOW - timedelta(days=31)
-    end_str = NOW.isoformat(timespec="milliseconds").replace("+00:00", "Z")
-    start_str = START.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+    # Prepare dates for API fetch (same bucketed window as the market pages)
+    start_str, end_str = snapped_window_strings(RESERVE_HISTORY_DAYS)
+
+    # Fetch every market concurrently before rendering the cards
+    with st.spinner("Loading market metrics..."):
+        frames = fetch_market_frames(
+            tuple((market["lending_market"], market["reserve"]) for market in MARKETS),
+            start_str,
+            end_str,
+        )
 
     # Iterate over markets
     for market in MARKETS:
@@ -136,11 +102,8 @@ def markets_overview():
                 if st.button("View Details", key=f"btn_{market['name']}"):
                     st.switch_page(st.Page(market["page_path"], title=market["page_title"]))
 
-            # Fetch Data
-            data = fetch_market_history(market["lending_market"], market["reserve"], start_str, end_str)
-            hist = data.get("history", [])
-            
-            metrics = process_market_data(hist)
+            df = frames.get((market["lending_market"], market["reserve"]))
+            metrics = process_market_data(df)
             
             if metrics:
                 c1, c2, c3 = st.columns(3)
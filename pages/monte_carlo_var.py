@@ -0,0 +1,114 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+from src.database import get_max_position_timestamp, get_market_positions
+from src.monte_carlo import estimate_price_model, oracle_price_series, simulate_losses, var_es, uncovered_symbols, DEFAULT_DAILY_VOLATILITY
+from src.time_window import snapped_window_strings
+from src.cache import persistent_cache, cache_tag, refresh_caches, api_token, API_TAG, SNAPSHOT_TAG
+from pages.mappings.markets import get_market_config, get_all_market_reserves, get_market_reserves
+from pages.utils.market_utils import fetch_market_frames, RESERVE_HISTORY_DAYS
+
+QUANTILES = [0.9, 0.95, 0.975, 0.99, 0.995, 0.999]
+DEFAULT_SCENARIOS = 10_000
+DEFAULT_HORIZON_DAYS = 1
+
+def load_oracle_prices(market: str) -> dict:
+    """Oracle price history of every reserve of the market, keyed by symbol."""
+    # Same window as the market pages, so configured reserves come straight from their cache
+    start_str, end_str = snapped_window_strings(RESERVE_HISTORY_DAYS)
+    lending_market = get_market_config(market)["lending_market"]
+    reserves = get_all_market_reserves(market)
+    frames = fetch_market_frames(tuple((lending_market, r) for r in reserves.values()), start_str, end_str)
+    return oracle_price_series({symbol: frames.get((lending_market, r)) for symbol, r in reserves.items()})
+
+@cache_tag(SNAPSHOT_TAG)
+@st.cache_data(ttl=300, show_spinner=False)
+@persistent_cache(ttl=300)
+def load_simulation(timestamp, market, scenarios, horizon_days, default_volatility, seed):
+    positions = get_market_positions(timestamp, market)
+    symbols = sorted(set(positions["supply_symbol"].dropna().unique()) | set(positions["borrow_symbol"].dropna().unique()))
+    model = estimate_price_model(symbols, load_oracle_prices(market), default_volatility)
+    losses = simulate_losses(positions, model, scenarios=scenarios, horizon_days=horizon_days, seed=seed)
+    return model, losses
+
+def monte_carlo_var():
+    c_header, c_refresh = st.columns([0.85, 0.15])
+    with c_header:
+        st.header("Liquidation VaR", help="Monte Carlo distribution of liquidatable debt and bad debt under correlated price moves of every asset in the market.")
+    with c_refresh:
+        refresh = st.button("Refresh", key="refresh_mc_var")
+
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        market = st.selectbox("Select Market", ["Main", "JLP", "Maple"], key="mc_var_market")
+    with c2:
+        scenarios = st.number_input("Scenarios", min_value=1_000, max_value=200_000, value=DEFAULT_SCENARIOS, step=1_000, key="mc_var_scenarios")
+    with c3:
+        horizon_days = st.number_input("Horizon (days)", min_value=1, max_value=30, value=DEFAULT_HORIZON_DAYS, key="mc_var_horizon")
+
+    c4, c5 = st.columns(2)
+    with c4:
+        quantiles = st.multiselect("Quantiles", QUANTILES, default=[0.95, 0.99], format_func=lambda q: f"{q:.1%}", key="mc_var_quantiles")
+    with c5:
+        default_volatility = st.number_input(
+            "Default daily volatility (%)",
+            min_value=0.1, max_value=50.0, value=DEFAULT_DAILY_VOLATILITY * 100, step=0.5,
+            help="Used for non-stablecoin assets of the market without an oracle price history; such assets move independently of the others.",
+            key="mc_var_default_vol",
+        ) / 100
+
+    with st.spinner("Running simulation..."):
+        ts = get_max_position_timestamp()
+        if ts is None:
+            st.error("Could not fetch timestamp.")
+            return
+        args = (ts, market, int(scenarios), float(horizon_days), float(default_volatility), 0)
+        if refresh:
+            # Drops caches whose source moved and re-runs only the entries behind this view
+            refresh_caches(
+                {SNAPSHOT_TAG: ts, API_TAG: api_token()},
+                calls=((load_simulation, *args), (get_market_reserves, get_market_config(market)["lending_market"])),
+            )
+        model, losses = load_simulation(*args)
+
+    if losses.empty:
+        st.warning("No data available for the selected parameters.")
+        return
+
+    st.markdown(f"**Data Timestamp:** {pd.to_datetime(ts, unit='s')} | **Scenarios:** {len(losses):,}")
+
+    uncovered = uncovered_symbols(model)
+    if len(uncovered) == len(model):
+        st.error("No oracle price history is available for any asset of this market: every price is drawn independently at a default volatility, so these results are **uncorrelated**.")
+    elif uncovered:
+        st.warning(f"No usable oracle price history for {', '.join(uncovered)}. These assets are drawn **uncorrelated** with the rest at a default volatility.")
+
+    if quantiles:
+        st.subheader("VaR / Expected Shortfall" + (" (uncorrelated)" if len(uncovered) == len(model) else " (partly uncorrelated)" if uncovered else ""))
+        rows = []
+        for column, label in [("liquidatable_debt", "Liquidatable Debt"), ("bad_debt", "Bad Debt")]:
+            stats = var_es(losses[column].to_numpy(), sorted(quantiles))
+            for _, r in stats.iterrows():
+                rows.append({"Metric": label, "Quantile": f"{r['quantile']:.1%}", "VaR": r["var"], "ES": r["es"]})
+        st.dataframe(
+            pd.DataFrame(rows),
+            column_config={
+                "VaR": st.column_config.NumberColumn(format="$%.0f"),
+                "ES": st.column_config.NumberColumn(format="$%.0f"),
+            },
+            hide_index=True,
+            use_container_width=True,
+        )
+
+    metric = st.radio("Distribution", ["Liquidatable Debt", "Bad Debt"], horizontal=True, key="mc_var_metric")
+    column = "liquidatable_debt" if metric == "Liquidatable Debt" else "bad_debt"
+    fig = px.histogram(losses, x=column, nbins=100, title=f"{metric} across scenarios", labels={column: f"{metric} (USD)"})
+    for q in sorted(quantiles):
+        fig.add_vline(x=losses[column].quantile(q), line_dash="dash", annotation_text=f"VaR {q:.1%}")
+    st.plotly_chart(fig, use_container_width=True)
+
+    with st.expander("Price model"):
+        st.markdown("Daily volatilities and correlations of oracle log returns. Assets marked `default` have no usable price history.")
+        st.dataframe(model[["volatility", "source"]], use_container_width=True)
+        corr = model.drop(columns=["volatility", "source"])
+        st.plotly_chart(px.imshow(corr, zmin=-1, zmax=1, color_continuous_scale="RdBu", title="Correlation"), use_container_width=True)
@@ -1,13 +1,20 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from src.database import get_position_at_risk_data, get_position_details
+from src.database import get_max_position_timestamp, get_position_details
+from src.position_at_risk_store import get_position_at_risk_history
+from src.cache import persistent_cache, cache_tag, refresh_caches, clear_entry, SNAPSHOT_TAG
 
+@cache_tag(SNAPSHOT_TAG)
 @st.cache_data(ttl=300)
-def load_data(market, asset, threshold=1.1):
-    return get_position_at_risk_data(market, asset, threshold)
+@persistent_cache(ttl=300)
+def load_data(market, asset, max_ts, threshold=1.1):
+    # max_ts is part of the cache key so a new snapshot triggers an incremental refresh
+    return get_position_at_risk_history(market, asset, threshold)
 
+@cache_tag(SNAPSHOT_TAG)
 @st.cache_data(ttl=300)
+@persistent_cache(ttl=300)
 def load_position_details(timestamp, market, asset):
     return get_position_details(timestamp, market, asset)
 
@@ -16,9 +23,7 @@ def position_at_risk():
     with c_header:
         st.header("Position at Risk")
     with c_refresh:
-        if st.button("Refresh", key="refresh_pos_risk"):
-            st.cache_data.clear()
-            st.rerun()
+        refresh = st.button("Refresh", key="refresh_pos_risk")
 
     # Top Level Filters
     c1, c2 = st.columns(2)
@@ -29,8 +34,12 @@ def position_at_risk():
 
     # Load Data
     with st.spinner("Loading data..."):
+        max_ts = get_max_position_timestamp()
+        if refresh:
+            # Drops caches whose source moved and re-runs only the entry behind this view
+            refresh_caches({SNAPSHOT_TAG: max_ts}, calls=((load_data, market, asset, max_ts, 1.1),))
         # Threshold is hardcoded to 1.1 as per request
-        df = load_data(market, asset, threshold=1.1)
+        df = load_data(market, asset, max_ts, 1.1)
 
     if df.empty:
         st.warning("No data available for the selected parameters.")
@@ -162,6 +171,8 @@ def position_at_risk():
     with st.spinner("Loading detailed position data..."):
         # Use the latest timestamp from the main dataframe
         latest_ts = int(latest_df['timestamp'].timestamp())
+        if refresh:
+            clear_entry(load_position_details, latest_ts, market, asset)
         df_details = load_position_details(latest_ts, market, asset)
     
     if not df_details.empty:
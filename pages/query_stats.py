@@ -0,0 +1,54 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+from src.query_stats import summary, slow_queries, SLOW_QUERY_MS, STATS_WINDOW
+
+def query_stats_page():
+    c_header, c_refresh = st.columns([0.85, 0.15])
+    with c_header:
+        st.title("Query Performance", help=f"Latency, rows and bytes of every SQL query issued by this server process over the last {STATS_WINDOW} calls per query.")
+    with c_refresh:
+        if st.button("Refresh", key="refresh_query_stats"):
+            st.rerun()
+
+    df = summary()
+    if df.empty:
+        st.info("No queries recorded yet.")
+        return
+
+    fig = px.bar(
+        df.melt(id_vars="query", value_vars=["p50_ms", "p95_ms"], var_name="percentile", value_name="ms"),
+        x="query",
+        y="ms",
+        color="percentile",
+        barmode="group",
+        title="Latency per Query (ms)",
+    )
+    fig.update_layout(xaxis_title=None, yaxis_title="ms", legend_title=None)
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.dataframe(
+        df,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "p50_ms": st.column_config.NumberColumn("p50 (ms)", format="%.0f"),
+            "p95_ms": st.column_config.NumberColumn("p95 (ms)", format="%.0f"),
+            "max_ms": st.column_config.NumberColumn("max (ms)", format="%.0f"),
+            "avg_rows": st.column_config.NumberColumn("avg rows", format="%.0f"),
+            "avg_kb": st.column_config.NumberColumn("avg KB", format="%.1f"),
+        },
+    )
+
+    st.subheader(f"Slow Queries (> {SLOW_QUERY_MS:.0f} ms)")
+    slow = slow_queries()
+    if not slow:
+        st.caption("None so far.")
+        return
+    for entry in slow:
+        at = pd.to_datetime(entry["at"], unit="s", utc=True).strftime("%Y-%m-%d %H:%M:%S")
+        with st.expander(f"{at} · {entry['query']} · {entry['ms']:.0f} ms · {entry['rows']:,} rows · {entry['page']}"):
+            if entry["plan"]:
+                st.code(entry["plan"], language="text")
+            else:
+                st.caption("No plan captured (set SLOW_QUERY_EXPLAIN=1 to capture EXPLAIN ANALYZE output).")
@@ -1,21 +1,23 @@
 import streamlit as st
 import pandas as pd
 from src.database import get_max_position_timestamp, get_pyusd_main_positions
+from src.cache import persistent_cache, cache_tag, SNAPSHOT_TAG
+
+@cache_tag(SNAPSHOT_TAG)
+@st.cache_data(ttl=300)
+@persistent_cache(ttl=300)
+def load_data(max_ts):
+    if max_ts is None:
+        return None, pd.DataFrame()
+    
+    df = get_pyusd_main_positions(max_ts)
+    return max_ts, df
 
 def user_positions():
     st.title("User Positions", help="Detailed list of all user positions in the Main market involving PYUSD, including supply and borrow amounts, loan-to-value (LTV) ratios, and liquidation thresholds.")
-    
-    @st.cache_data(ttl=300)
-    def load_data():
-        max_ts = get_max_position_timestamp()
-        if max_ts is None:
-            return None, pd.DataFrame()
-        
-        df = get_pyusd_main_positions(max_ts)
-        return max_ts, df
 
     with st.spinner("Loading user positions..."):
-        max_ts, df = load_data()
+        max_ts, df = load_data(get_max_position_timestamp())
     
     if max_ts:
         # Convert timestamp to readable format if it's a unix timestamp
@@ -5,10 +5,9 @@ from datetime import datetime
 from pandas.api.types import is_numeric_dtype, is_object_dtype
 from src.database import (
     get_max_position_timestamp, 
-    get_asset_positions, 
-    get_debt_distribution, 
-    get_collateral_distribution
+    get_asset_distributions
 )
+from src.cache import persistent_cache, cache_tag, refresh_caches, SNAPSHOT_TAG
 
 def filter_dataframe(df: pd.DataFrame, key_suffix: str) -> pd.DataFrame:
     """
@@ -60,14 +59,15 @@ def filter_dataframe(df: pd.DataFrame, key_suffix: str) -> pd.DataFrame:
 
     return df
 
+@cache_tag(SNAPSHOT_TAG)
 @st.cache_data(ttl=300)
+@persistent_cache(ttl=300)
 def load_market_data(market_name, asset_symbol, max_ts):
     if max_ts is None:
         return None, pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
     
-    df_pos = get_asset_positions(max_ts, market_name, asset_symbol)
-    df_debt = get_debt_distribution(max_ts, market_name, asset_symbol)
-    df_collat = get_collateral_distribution(max_ts, market_name, asset_symbol)
+    # One pass over the snapshot for all three tables
+    df_pos, df_debt, df_collat = get_asset_distributions(max_ts, market_name, asset_symbol)
     
     return max_ts, df_pos, df_debt, df_collat
 
@@ -76,13 +76,14 @@ def render_market_section(market_name, asset_symbol, toggle_key):
         with st.container(border=True):
             col1, col2 = st.columns([0.8, 0.2])
             with col2:
-                if st.button("Clear Cache & Refresh", key=f"refresh_{market_name}_{asset_symbol}"):
-                    st.cache_data.clear()
-                    st.rerun()
+                refresh = st.button("Refresh", key=f"refresh_{market_name}_{asset_symbol}")
 
             with st.spinner(f"Loading {market_name} Market data..."):
                 # Always fetch the latest timestamp first to ensure data freshness
                 current_ts = get_max_position_timestamp()
+                if refresh:
+                    # Drops caches whose source moved and re-runs only the entry behind this view
+                    refresh_caches({SNAPSHOT_TAG: current_ts}, calls=((load_market_data, market_name, asset_symbol, current_ts),))
                 st.info(f"Queried max timestamp from DB: `{current_ts}`")
                 ts, df_pos, df_debt, df_collat = load_market_data(market_name, asset_symbol, current_ts)
             
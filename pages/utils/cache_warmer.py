@@ -0,0 +1,89 @@
+import os
+import time
+import logging
+import threading
+from typing import Optional
+from src.database import get_max_position_timestamp
+from src.cache import advance_tag, SNAPSHOT_TAG
+from pages.mappings.markets import MARKET_CONFIGS, POSITION_ASSETS
+from pages.utils.asset_utils import load_market_data
+from pages.leverage import load_leverage_data, DEFAULT_DEBT_THRESHOLD
+from pages import liquidation_risk, position_at_risk, user_positions, monte_carlo_var
+from src.monte_carlo import DEFAULT_DAILY_VOLATILITY
+from src.cascade import DEPTH_USD, CLOSE_FACTOR, LIQUIDATION_BONUS
+
+# Polls the position table watermark and, whenever a new snapshot lands, runs every
+# page loader for every market/asset so user reruns hit warm caches.
+WARM_POLL_SECONDS = int(os.getenv("CACHE_WARM_POLL_SECONDS", "30"))
+
+def warm_all(max_ts: int):
+    """Runs every DB-backed page loader for `max_ts` with the arguments the pages use."""
+    calls = [(user_positions.load_data, (max_ts,), {})]
+    for cfg in MARKET_CONFIGS.values():
+        market = cfg["db_name"]
+        # Market-wide loaders run once per market, the rest once per asset
+        calls += [
+            (liquidation_risk.load_sensitivity_matrix, (max_ts, market), {}),
+            (monte_carlo_var.load_simulation, (max_ts, market, monte_carlo_var.DEFAULT_SCENARIOS, float(monte_carlo_var.DEFAULT_HORIZON_DAYS), DEFAULT_DAILY_VOLATILITY, 0), {}),
+        ]
+        for asset in POSITION_ASSETS:
+            calls += [
+                (load_market_data, (market, asset, max_ts), {}),
+                (load_leverage_data, (max_ts, market, asset, DEFAULT_DEBT_THRESHOLD), {}),
+                (liquidation_risk.load_data, (max_ts, market, asset), {}),
+                (liquidation_risk.load_shock_curves, (max_ts, market, asset), {}),
+                # The page's cascade defaults, typed as the page passes them
+                (liquidation_risk.load_cascade, (max_ts, market, asset, "linear", float(DEPTH_USD), float(CLOSE_FACTOR), float(LIQUIDATION_BONUS)), {}),
+                (position_at_risk.load_data, (market, asset, max_ts, 1.1), {}),
+                (position_at_risk.load_position_details, (max_ts, market, asset), {}),
+            ]
+    for loader, args, kwargs in calls:
+        try:
+            loader(*args, **kwargs)
+        except Exception as e:
+            logging.error("Cache warm failed for %s%s: %s", loader.__name__, args, str(e))
+
+class CacheWarmer:
+    """Background thread that re-warms all page caches on every new snapshot."""
+
+    def __init__(self, poll_seconds: int = WARM_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self.last_timestamp: Optional[int] = None
+        self.last_run_at: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="cache-warmer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self) -> dict:
+        return {
+            "last_timestamp": self.last_timestamp,
+            "last_run_at": self.last_run_at,
+            "last_duration": self.last_duration,
+            "running": self._thread is not None and self._thread.is_alive(),
+        }
+
+    def _run(self):
+        while not self._stop.is_set():
+            # A failed poll is logged and retried next time; it must not end the thread
+            try:
+                max_ts = get_max_position_timestamp()
+                if max_ts is not None and max_ts != self.last_timestamp:
+                    started = time.time()
+                    # Drop entries of the previous snapshot before warming the new one
+                    advance_tag(SNAPSHOT_TAG, max_ts)
+                    warm_all(max_ts)
+                    self.last_duration = time.time() - started
+                    self.last_run_at = started
+                    self.last_timestamp = max_ts
+                    logging.info("Warmed page caches for snapshot %s in %.1fs", max_ts, self.last_duration)
+            except Exception as e:
+                logging.error("Cache warmer poll failed: %s", str(e))
+            self._stop.wait(self.poll_seconds)
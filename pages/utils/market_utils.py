@@ -1,122 +1,83 @@
 import streamlit as st
-import requests
 import pandas as pd
 import json
 from datetime import datetime, timedelta, timezone
 import plotly.express as px
 import plotly.graph_objects as go
 from pages.utils.ui_components import fmt_compact, render_delta_bubbles
+from src.time_window import snapped_window_strings
+from src.asof import asof_lookup
+from src.reserve_history import get_reserve_history, get_reserve_histories, parse_reserve_history
+from src.cache import persistent_cache, cache_tag, API_TAG
 
+# History window shared by every caller of fetch_market_history so they hit the same cache entry
+RESERVE_HISTORY_DAYS = 90
+
+@cache_tag(API_TAG)
 @st.cache_data(ttl=600, show_spinner=False)
 def fetch_market_history(market: str, reserve: str, start: str, end: str):
-    base = "https://api.kamino.finance/kamino-market/"
-    url = (
-        base
-        + market
-        + "/reserves/"
-        + reserve
-        + "/metrics/history?env=mainnet-beta&start="
-        + start
-        + "&end="
-        + end
-    )
-    last_err = None
-    for attempt in range(3):
-        try:
-            r = requests.get(url, timeout=(5, 25))
-            r.raise_for_status()
-            return r.json()
-        except requests.exceptions.ReadTimeout as e:
-            last_err = e
-        except requests.RequestException as e:
-            last_err = e
-    return {"history": []}
+    # Served from the local reserve history store, which only downloads points newer than it
+    # already has and is itself persisted, so no disk cache tier is stacked on top
+    return get_reserve_history(market, reserve, start, end)
+
+@cache_tag(API_TAG)
+@st.cache_data(ttl=600, show_spinner=False)
+def fetch_market_frame(market: str, reserve: str, start: str, end: str):
+    """Parsed (typed, columnar) metrics history of one reserve."""
+    data = fetch_market_history(market, reserve, start, end)
+    return parse_reserve_history(data.get("history", []) if isinstance(data, dict) else [])
+
+@cache_tag(API_TAG)
+@st.cache_data(ttl=600, show_spinner=False)
+@persistent_cache(ttl=600)
+def fetch_market_frames(keys: tuple, start: str, end: str):
+    """
+    Fetches the history of several (market, reserve) pairs at once (missing ranges are
+    downloaded concurrently) and parses each one. Returns {(market, reserve): DataFrame}.
+    """
+    histories = get_reserve_histories(list(keys), start, end)
+    return {key: parse_reserve_history(data.get("history", [])) for key, data in histories.items()}
 
 def render_market_details(market_name: str, lending_market: str, reserve_address: str, asset_name: str = "PYUSD"):
     st.title(f"{asset_name}: {market_name}", help=f"Deep dive into the {asset_name} reserve within the {market_name}. Includes supply/borrow metrics, utilization rates, and historical trends.")
     NOW = datetime.now(timezone.utc)
-    START = NOW - timedelta(days=90)
-    end_str = NOW.isoformat(timespec="milliseconds").replace("+00:00", "Z")
-    start_str = START.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+    start_str, end_str = snapped_window_strings(RESERVE_HISTORY_DAYS, now=NOW)
 
     with st.spinner("Loading market metrics..."):
-        data = fetch_market_history(lending_market, reserve_address, start_str, end_str)
+        df = fetch_market_frame(lending_market, reserve_address, start_str, end_str)
     
-    if isinstance(data, dict) and len(data.get("history", [])) == 0:
+    if df.empty:
         st.warning("Market API timed out or returned no data; showing empty state.")
 
-    hist = data.get("history", []) if isinstance(data, dict) else []
-    rows = []
-    for h in hist:
-        ts = h.get("timestamp")
-        m = h.get("metrics", {})
-        rows.append(
-            {
-                "timestamp": ts,
-                "symbol": m.get("symbol"),
-                "decimals": m.get("decimals"),
-                "borrowTvl": m.get("borrowTvl"),
-                "depositTvl": m.get("depositTvl"),
-                "borrowCurve": m.get("borrowCurve"),
-                "totalSupply": m.get("totalSupply"),
-                "borrowFactor": m.get("borrowFactor"),
-                "totalBorrows": m.get("totalBorrows"),
-                "totalLiquidity": m.get("totalLiquidity"),
-                "protocolTakeRate": m.get("protocolTakeRate"),
-                "borrowInterestAPY": m.get("borrowInterestAPY"),
-                "supplyInterestAPY": m.get("supplyInterestAPY"),
-                "reserveBorrowLimit": m.get("reserveBorrowLimit"),
-                "assetOraclePriceUSD": m.get("assetOraclePriceUSD"),
-                "reserveDepositLimit": m.get("reserveDepositLimit"),
-            }
-        )
-    df = pd.DataFrame(rows)
-    if not df.empty:
-        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce", utc=True)
-        for c in [
-            "borrowTvl",
-            "depositTvl",
-            "totalSupply",
-            "totalBorrows",
-            "totalLiquidity",
-            "borrowInterestAPY",
-            "supplyInterestAPY",
-            "reserveBorrowLimit",
-            "reserveDepositLimit",
-            "assetOraclePriceUSD",
-        ]:
-            df[c] = pd.to_numeric(df[c], errors="coerce")
-        df["decimals"] = pd.to_numeric(df.get("decimals"), errors="coerce")
-        scale = (10 ** df["decimals"].fillna(0)).astype(float)
-        df["reserveDepositLimit"] = df["reserveDepositLimit"] / scale
-        df["reserveBorrowLimit"] = df["reserveBorrowLimit"] / scale
-
     df_30d = df.copy()
     if not df.empty:
         df_30d = df[df["timestamp"] >= (NOW - timedelta(days=31))]
 
     latest = df.sort_values("timestamp").tail(1)
     if not latest.empty:
-        last_t = latest.iloc[0]["timestamp"]
+
+        # All horizons for every KPI column in one as-of lookup
+        snap = asof_lookup(df, [
+            "totalSupply",
+            "totalBorrows",
+            "reserveDepositLimit",
+            "reserveBorrowLimit",
+            "borrowInterestAPY",
+        ])
+
+        def ratio(num, denom):
+            return (num / denom) if pd.notnull(num) and pd.notnull(denom) and denom != 0 else None
 
         def val_at(days: int, expr: str):
-            target = last_t - timedelta(days=days)
-            sub = df.loc[df["timestamp"] <= target]
-            if sub.empty:
+            row = snap.get(days)
+            if row is None:
                 return None
-            row = sub.tail(1).iloc[0]
             if expr == "supply_util":
-                denom = pd.to_numeric(row["reserveDepositLimit"], errors="coerce")
-                num = pd.to_numeric(row["totalSupply"], errors="coerce")
-                return (num / denom) if pd.notnull(num) and pd.notnull(denom) and denom != 0 else None
+                return ratio(row["totalSupply"], row["reserveDepositLimit"])
             if expr == "market_util":
-                denom = pd.to_numeric(row["totalSupply"], errors="coerce")
-                num = pd.to_numeric(row["totalBorrows"], errors="coerce")
-                return (num / denom) if pd.notnull(num) and pd.notnull(denom) and denom != 0 else None
+                return ratio(row["totalBorrows"], row["totalSupply"])
             if expr == "borrow_cap_util":
-                denom = pd.to_numeric(row["reserveBorrowLimit"], errors="coerce")
-                num = pd.to_numeric(row["totalBorrows"], errors="coerce")
-                return (num / denom) if pd.notnull(num) and pd.notnull(denom) and denom != 0 else None
+                return ratio(row["totalBorrows"], row["reserveBorrowLimit"])
             return row.get(expr)
 
         price = latest.iloc[0]["assetOraclePriceUSD"]
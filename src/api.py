@@ -1,14 +1,66 @@
+import asyncio
+import aiohttp
 import requests
+import logging
 import pandas as pd
 import streamlit as st
+from typing import Optional
+from src.http_client import get_json, get_json_async, PER_HOST_CONCURRENCY
+from src.cache import persistent_cache, cache_tag, API_TAG
 
+KAMINO_API_BASE = "https://api.kamino.finance"
+# Max number of in-flight requests for batch fetches
+KAMINO_API_CONCURRENCY = 4
+
+def _reserve_history_url(market: str, reserve: str, start: str, end: str) -> str:
+    return (
+        KAMINO_API_BASE
+        + "/kamino-market/"
+        + market
+        + "/reserves/"
+        + reserve
+        + "/metrics/history?env=mainnet-beta&start="
+        + start
+        + "&end="
+        + end
+    )
+
+def fetch_reserve_metrics_history(market: str, reserve: str, start: str, end: str) -> Optional[dict]:
+    """
+    Fetches reserve metrics history between `start` and `end` (ISO strings) from the
+    Kamino API. Returns None if every attempt failed.
+    """
+    url = _reserve_history_url(market, reserve, start, end)
+    try:
+        return get_json(url, timeout=(5, 25))
+    except requests.RequestException as e:
+        logging.error("Error fetching reserve history %s/%s: %s", market, reserve, str(e))
+        return None
+
+async def _fetch_reserve_metrics_histories(items: list, concurrency: int) -> list:
+    semaphore = asyncio.Semaphore(min(concurrency, PER_HOST_CONCURRENCY))
+    timeout = aiohttp.ClientTimeout(sock_connect=5, sock_read=25)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        return await asyncio.gather(*[
+            get_json_async(session, semaphore, _reserve_history_url(*item)) for item in items
+        ])
+
+def fetch_reserve_metrics_histories(items: list, concurrency: int = KAMINO_API_CONCURRENCY) -> list:
+    """
+    Fetches several reserve metrics histories concurrently. `items` is a list of
+    (market, reserve, start, end); results come back in the same order, None for failures.
+    """
+    if not items:
+        return []
+    return asyncio.run(_fetch_reserve_metrics_histories(items, concurrency))
+
+@cache_tag(API_TAG)
 @st.cache_data(ttl=3600)
+@persistent_cache(ttl=3600)
 def fetch_liquidation_history():
     url = "https://services.defirisk.dev.sentora.com/metric/solana/kamino/liquidation/history?period=cumulative"
     try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        data = response.json()
+        data = get_json(url, timeout=30)
     except Exception as e:
         st.error(f"Failed to fetch data: {e}")
         return pd.DataFrame()
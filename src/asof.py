@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+from typing import Optional
+
+# KPI deltas are shown against the latest row, 1, 7 and 30 days earlier
+HORIZON_DAYS = (0, 1, 7, 30)
+_NS_PER_DAY = 86_400 * 10**9
+
+def asof_lookup(df: pd.DataFrame, columns: list, horizons: tuple = HORIZON_DAYS, time_col: str = "timestamp") -> dict:
+    """
+    Values of `columns` as of `latest - days` for every horizon, using a sorted
+    timestamp index and one `searchsorted` call instead of a boolean scan per lookup.
+
+    Returns {days: {column: value}} with horizon 0 being the latest row. A horizon
+    maps to None when no row is at or before its target time.
+    """
+    if df is None or df.empty:
+        return {d: None for d in horizons}
+
+    ts = pd.DatetimeIndex(df[time_col])
+    valid = ~ts.isna()
+    if not valid.all():
+        df, ts = df[valid], ts[valid]
+    if len(ts) == 0:
+        return {d: None for d in horizons}
+
+    t = ts.as_unit("ns").asi8
+    order = None
+    if not ts.is_monotonic_increasing:
+        order = np.argsort(t, kind="stable")
+        t = t[order]
+
+    targets = t[-1] - np.asarray(horizons, dtype="int64") * _NS_PER_DAY
+    idx = np.searchsorted(t, targets, side="right") - 1
+    found = idx >= 0
+    positions = idx[found] if order is None else order[idx[found]]
+
+    rows = df[columns].iloc[positions].to_dict("records")
+    result = {}
+    it = iter(rows)
+    for days, ok in zip(horizons, found):
+        result[days] = next(it) if ok else None
+    return result
+
+def asof_value(snapshot: dict, days: int, column: str) -> Optional[float]:
+    """Single value from an `asof_lookup` result, None if the horizon had no row."""
+    row = snapshot.get(days)
+    return None if row is None else row.get(column)
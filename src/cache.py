@@ -0,0 +1,278 @@
+import os
+import time
+import pickle
+import sqlite3
+import hashlib
+import logging
+import functools
+import threading
+import pandas as pd
+from datetime import datetime, timezone
+from src.time_window import floor_to_bucket
+
+# Disk tier behind the in-process `st.cache_data` caches, so API and SQL results survive
+# restarts and redeploys. Stack it under `st.cache_data`:
+#
+#     @st.cache_data(ttl=300)
+#     @persistent_cache(ttl=300)
+#     def load_data(...): ...
+#
+# Entries live in a single SQLite file, expire after their TTL and are evicted least
+# recently used first once the file grows past DISK_CACHE_MAX_BYTES.
+
+DISK_CACHE_PATH = os.getenv("DISK_CACHE_PATH", os.path.join(".cache", "disk_cache.sqlite"))
+DISK_CACHE_MAX_BYTES = int(os.getenv("DISK_CACHE_MAX_MB", "512")) * 1024 * 1024
+# Bump to invalidate every persisted entry (e.g. after changing the shape of cached results)
+CACHE_VERSION = 1
+
+class DiskCache:
+    """Small SQLite-backed key/value store with TTLs and size-bounded LRU eviction."""
+
+    def __init__(self, path: str = DISK_CACHE_PATH, max_bytes: int = DISK_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str):
+        """Returns (hit, value)."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT value, expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return False, None
+            if row[1] <= now:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                conn.commit()
+                return False, None
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            conn.commit()
+        return True, pickle.loads(row[0])
+
+    def set(self, key: str, value, ttl: float):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, sqlite3.Binary(blob), len(blob), now + ttl, now),
+            )
+            self._evict(conn, now)
+            conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            conn.commit()
+
+    def delete_prefix(self, prefix: str):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM entries WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used entries until we are back under the budget
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_access ASC").fetchall():
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+_disk_cache = None
+_disk_cache_lock = threading.Lock()
+
+def get_disk_cache() -> DiskCache:
+    """Returns the singleton disk cache."""
+    global _disk_cache
+    with _disk_cache_lock:
+        if _disk_cache is None:
+            _disk_cache = DiskCache()
+    return _disk_cache
+
+def _is_empty(value) -> bool:
+    """
+    Failed loads in this app come back as None / empty frames / empty payloads, or as
+    a tuple or dict whose frames are all empty (e.g. every fetch of a batch failed).
+    """
+    if value is None:
+        return True
+    if isinstance(value, pd.DataFrame):
+        return value.empty
+    if isinstance(value, dict) and "history" in value:
+        return len(value["history"]) == 0
+    if isinstance(value, (list, dict)) and len(value) == 0:
+        return True
+    if isinstance(value, (tuple, dict)):
+        frames = [v for v in (value.values() if isinstance(value, dict) else value) if isinstance(v, pd.DataFrame)]
+        return bool(frames) and all(f.empty for f in frames)
+    return False
+
+def cache_key(func, version: int, args: tuple, kwargs: dict) -> str:
+    """Versioned key: <module>.<qualname>:v<CACHE_VERSION>.<version>:<hash of arguments>."""
+    digest = hashlib.sha256(pickle.dumps((args, sorted(kwargs.items())), protocol=4)).hexdigest()
+    return f"{func.__module__}.{func.__qualname__}:v{CACHE_VERSION}.{version}:{digest}"
+
+def persistent_cache(ttl: float, version: int = 1, should_cache=None):
+    """
+    Decorator adding a disk tier to `func`. `version` is part of the key, so bumping it
+    orphans old entries of that function. Empty results are not persisted unless
+    `should_cache` says otherwise.
+    """
+    should_cache = should_cache or (lambda value: not _is_empty(value))
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = get_disk_cache()
+            try:
+                key = cache_key(func, version, args, kwargs)
+                hit, value = cache.get(key)
+            except Exception as e:
+                logging.error("Disk cache read failed for %s: %s", func.__qualname__, str(e))
+                return func(*args, **kwargs)
+            if hit:
+                return value
+            value = func(*args, **kwargs)
+            if should_cache(value):
+                try:
+                    cache.set(key, value, ttl)
+                except Exception as e:
+                    logging.error("Disk cache write failed for %s: %s", func.__qualname__, str(e))
+            return value
+
+        prefix = f"{func.__module__}.{func.__qualname__}:"
+        wrapper.clear_disk = lambda: get_disk_cache().delete_prefix(prefix)
+        # Drops the single entry of one call; pass the arguments exactly as the caller does
+        wrapper.clear_disk_entry = lambda *args, **kwargs: get_disk_cache().delete(cache_key(func, version, args, kwargs))
+        return wrapper
+    return decorator
+
+# --- Dependency tags ---
+# Loaders are tagged with the source they read from. Each source has a token that changes
+# when its data does: the position-table watermark for DB snapshot loaders and the current
+# time bucket for API loaders. Callers read the token and pass it in, so this module stays
+# independent of the database. Advancing a tag only invalidates it if its token moved,
+# instead of `st.cache_data.clear()` wiping every cache for every session. Stack the tag on top:
+#
+#     @cache_tag(SNAPSHOT_TAG)
+#     @st.cache_data(ttl=300)
+#     @persistent_cache(ttl=300)
+#     def load_data(max_ts, ...): ...
+
+SNAPSHOT_TAG = "snapshot"
+API_TAG = "api"
+
+_tagged = {}
+_tokens = {}
+_tags_lock = threading.Lock()
+
+def cache_tag(tag: str):
+    """Registers a cached loader under `tag` so `invalidate_tag` can clear it."""
+    def decorator(func):
+        with _tags_lock:
+            _tagged.setdefault(tag, []).append(func)
+        return func
+    return decorator
+
+def _clear_loader(func):
+    """Clears the `st.cache_data` tier and, if present, the disk tier of a loader."""
+    if hasattr(func, "clear"):
+        func.clear()
+    inner = func
+    while inner is not None:
+        if hasattr(inner, "clear_disk"):
+            inner.clear_disk()
+            break
+        inner = getattr(inner, "__wrapped__", None)
+
+def _clear_loaders(loaders):
+    for func in loaders:
+        try:
+            _clear_loader(func)
+        except Exception as e:
+            logging.error("Cache invalidation failed for %s: %s", getattr(func, "__qualname__", func), str(e))
+
+def invalidate_tag(tag: str):
+    """Clears every loader registered under `tag`, in memory and on disk."""
+    with _tags_lock:
+        loaders = list(_tagged.get(tag, []))
+    _clear_loaders(loaders)
+
+def api_token():
+    """Token of the API source: the current time bucket."""
+    return floor_to_bucket(datetime.now(timezone.utc))
+
+def advance_tag(tag: str, token) -> bool:
+    """
+    Records `token` for `tag` and invalidates the tag if the token moved since it was
+    last seen. The first token seen by a process is only recorded. Returns True if
+    the tag was invalidated.
+    """
+    if token is None:
+        return False
+    with _tags_lock:
+        previous = _tokens.get(tag)
+        _tokens[tag] = token
+    if previous is None or previous == token:
+        return False
+    invalidate_tag(tag)
+    logging.info("Invalidated %s caches (%s -> %s)", tag, previous, token)
+    return True
+
+def clear_entry(func, *args):
+    """
+    Clears the entry of one call of a cached loader, in memory and on disk, leaving its
+    other entries (other markets, assets, sessions) alone. `args` must be passed exactly
+    as the loader is called.
+    """
+    try:
+        if hasattr(func, "clear"):
+            func.clear(*args)
+        inner = func
+        while inner is not None:
+            if hasattr(inner, "clear_disk_entry"):
+                inner.clear_disk_entry(*args)
+                break
+            inner = getattr(inner, "__wrapped__", None)
+    except Exception as e:
+        logging.error("Cache invalidation failed for %s: %s", getattr(func, "__qualname__", func), str(e))
+
+def refresh_caches(tokens: dict, calls: tuple = ()) -> list:
+    """
+    Explicit refresh from a page. Advances each tag of `tokens` ({tag: current source
+    token}), then clears the entries behind the current view, `calls` being
+    `(loader, *args)` tuples: a load that failed and cached an empty result is retried
+    even when no token moved. Returns the tags that were invalidated.
+    """
+    invalidated = [tag for tag, token in tokens.items() if advance_tag(tag, token)]
+    for call in calls:
+        clear_entry(call[0], *call[1:])
+    return invalidated
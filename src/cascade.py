@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+from src.stress import health_factors, _sort_segments, _search_segments
+
+# Liquidation cascades with price-impact feedback. An initial collateral price drop c0
+# makes positions with HF0 <= 1 / (1 - c0) liquidatable; liquidators sell the seized
+# collateral, which pushes the price down by impact(sold), which liquidates more
+# positions, and so on until no new position crosses its threshold:
+#     c_{k+1} = 1 - (1 - c0) * (1 - impact(sold(c_k)))
+# Positions are sorted once by (symbol, HF0) with prefix sums of debt and seized
+# collateral, so each iteration of the whole (symbol x initial shock) grid is one
+# searchsorted per symbol within that symbol's run.
+
+CASCADE_SHOCKS = tuple(np.round(np.arange(0.0, 0.5001, 0.01), 2))
+CLOSE_FACTOR = 0.2  # share of a position's debt repaid per liquidation
+LIQUIDATION_BONUS = 0.05
+DEPTH_USD = 1_000_000.0  # USD of collateral sold that moves its price by 1%
+MAX_IMPACT = 0.99
+MAX_ITERATIONS = 100
+
+def linear_impact(sold: np.ndarray, depth: float) -> np.ndarray:
+    """Price drop proportional to the sold value: 1% per `depth` USD."""
+    return np.minimum(0.01 * sold / depth, MAX_IMPACT)
+
+def sqrt_impact(sold: np.ndarray, depth: float) -> np.ndarray:
+    """Square-root impact: 1% at `depth` USD, growing with the square root of the sold value."""
+    return np.minimum(0.01 * np.sqrt(sold / depth), MAX_IMPACT)
+
+IMPACT_MODELS = {"linear": linear_impact, "sqrt": sqrt_impact}
+
+def cascade_grid(
+    df: pd.DataFrame,
+    shocks: tuple = CASCADE_SHOCKS,
+    impact: str = "linear",
+    depth: float = DEPTH_USD,
+    close_factor: float = CLOSE_FACTOR,
+    liquidation_bonus: float = LIQUIDATION_BONUS,
+    max_iterations: int = MAX_ITERATIONS,
+) -> dict:
+    """
+    Runs the cascade for every collateral symbol of a liquidation risk frame and every
+    initial shock. Each liquidation seizes min(close_factor * (1 + bonus) * debt,
+    collateral) of collateral, which is sold into a market of the given `depth`.
+    Positions with the same asset on both sides are unaffected by its price.
+
+    Returns {"symbols", "shocks", "initial_debt", "final_debt", "final_shock",
+    "iterations", "converged"}, the grids having shape (len(symbols), len(shocks)).
+    `final_debt` is always the debt liquidatable at `final_shock`; where `converged`
+    is False, `max_iterations` ran out before the cascade reached its fixed point.
+    """
+    impact_fn = IMPACT_MODELS[impact]
+    shocks = np.asarray(shocks, dtype="float64")
+    d = health_factors(df)
+    d = d[d["supply_symbol"].notna() & (d["supply_symbol"] != d["borrow_symbol"])]
+    symbols = sorted(d["supply_symbol"].unique())
+    codes = pd.Categorical(d["supply_symbol"], categories=symbols).codes
+    hf = d["hf"].clip(lower=0).to_numpy(dtype="float64")
+    supply = d["supply_value"].to_numpy(dtype="float64")
+    borrow = d["borrow_value"].to_numpy(dtype="float64")
+    seized = np.minimum(close_factor * (1 + liquidation_bonus) * borrow, supply)
+
+    order, keys, bounds = _sort_segments(codes, hf, len(symbols))
+    cum_debt = np.r_[0.0, np.cumsum(borrow[order])]
+    cum_seized = np.r_[0.0, np.cumsum(seized[order])]
+
+    lo = bounds[:-1, None]
+    base = np.broadcast_to(1 - shocks[None, :], (len(symbols), len(shocks)))
+
+    def liquidated(shock):
+        # Index past the last position of each symbol whose HF0 <= 1 / (1 - shock)
+        return _search_segments(keys, bounds, 1 / (1 - shock), "right")
+
+    shock = 1 - base
+    hi = liquidated(shock)
+    initial_hi = hi
+    iterations = np.zeros(shock.shape, dtype="int64")
+    converged = np.zeros(shock.shape, dtype=bool)
+    for _ in range(max_iterations):
+        sold = cum_seized[hi] - cum_seized[lo]
+        shock = 1 - base * (1 - impact_fn(sold, depth))
+        # The liquidated set always matches the reported shock, converged or not
+        new_hi = liquidated(shock)
+        converged = new_hi == hi
+        hi = new_hi
+        if converged.all():
+            break
+        iterations += ~converged
+
+    return {
+        "symbols": symbols,
+        "shocks": shocks,
+        "initial_debt": cum_debt[initial_hi] - cum_debt[lo],
+        "final_debt": cum_debt[hi] - cum_debt[lo],
+        "final_shock": shock,
+        "iterations": iterations,
+        "converged": converged,
+    }
@@ -1,9 +1,27 @@
 import os
+import re
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 import logging
+from collections import OrderedDict
+from contextlib import contextmanager
 from sqlalchemy import create_engine, text
-from typing import Optional
+from typing import Iterator, Optional
 from dotenv import load_dotenv, dotenv_values
+from src.singleflight import single_flight
+from src import query_stats
+
+# Optional Arrow-native fetch path (`uv sync --extra arrow`). Without the ADBC driver,
+# queries asking for Arrow fall back to pd.read_sql. Either way results reach callers
+# with numpy dtypes; Arrow only replaces the transport.
+try:
+    import adbc_driver_postgresql.dbapi as adbc_postgresql
+except ImportError:
+    adbc_postgresql = None
 
 # Load environment variables
 load_dotenv()
@@ -41,10 +59,73 @@ def get_engine():
         )
     return _engine
 
-def run_query(query: str, params: Optional[dict] = None) -> pd.DataFrame:
+_BIND_PARAM = re.compile(r"(?<![:\w]):(\w+)")
+
+def _to_positional(query: str, params: dict) -> tuple:
+    """Rewrites SQLAlchemy `:name` binds into libpq `$n` placeholders plus their values."""
+    values = []
+    def bind(m):
+        values.append(params[m.group(1)])
+        return f"${len(values)}"
+    return _BIND_PARAM.sub(bind, query), values
+
+# ADBC connections are kept in a small pool like the SQLAlchemy engine's, instead of a
+# new connection (and TLS/auth handshake) per query
+ADBC_POOL_SIZE = int(os.getenv("ADBC_POOL_SIZE", "4"))
+
+_adbc_pool = queue.LifoQueue()
+
+@contextmanager
+def _adbc_connection():
+    """Checks out a pooled ADBC connection; it is discarded instead of returned if the caller fails."""
+    try:
+        conn = _adbc_pool.get_nowait()
+    except queue.Empty:
+        conn = adbc_postgresql.connect(get_db_url(), autocommit=True)
+    healthy = False
+    try:
+        yield conn
+        healthy = True
+    finally:
+        if healthy and _adbc_pool.qsize() < ADBC_POOL_SIZE:
+            _adbc_pool.put(conn)
+        else:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+def _run_query_arrow(query: str, params: Optional[dict] = None) -> pd.DataFrame:
     """
-    Executes a SQL query and returns the result as a pandas DataFrame.
+    Fetches the result as Arrow record batches over ADBC. The frame is converted to
+    numpy dtypes at this boundary, so callers see the same dtypes as from read_sql.
     """
+    sql, values = _to_positional(query, params or {})
+    with _adbc_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, values or None)
+            table = cur.fetch_arrow_table()
+    return table.to_pandas()
+
+def _explain(query: str, params: Optional[dict] = None) -> str:
+    """EXPLAIN (ANALYZE, BUFFERS) plan of a query, for the slow-query log."""
+    with get_engine().connect() as conn:
+        rows = conn.execute(text("EXPLAIN (ANALYZE, BUFFERS) " + query), params or {}).fetchall()
+    return "\n".join(r[0] for r in rows)
+
+def _record_query(caller: tuple, started: float, df: pd.DataFrame, query: str, params: Optional[dict]):
+    query_stats.record(
+        caller[0], caller[1], time.perf_counter() - started, len(df), query_stats.frame_bytes(df),
+        explain=lambda: _explain(query, params),
+    )
+
+def _execute_query(query: str, params: Optional[dict] = None, arrow: bool = False) -> pd.DataFrame:
+    if arrow and adbc_postgresql is not None:
+        try:
+            return _run_query_arrow(query, params)
+        except Exception as e:
+            logging.error("Arrow fetch failed, falling back to read_sql: %s", str(e))
+
     engine = get_engine()
     try:
         with engine.connect() as conn:
@@ -57,6 +138,117 @@ def run_query(query: str, params: Optional[dict] = None) -> pd.DataFrame:
         logging.error(f"Error executing query: {e}")
         return pd.DataFrame()
 
+@single_flight()
+def run_query(query: str, params: Optional[dict] = None, arrow: bool = False) -> pd.DataFrame:
+    """
+    Executes a SQL query and returns the result as a pandas DataFrame.
+    Identical queries already in flight are coalesced onto a single execution.
+
+    With `arrow=True` the result is fetched as Arrow record batches (ADBC), skipping
+    the per-row Python objects of read_sql; the frame still has numpy dtypes. If the
+    driver is missing or the fetch fails, plain read_sql is used.
+
+    Latency, rows and bytes are recorded in `src.query_stats` under the name of
+    the calling function.
+    """
+    caller = query_stats.caller_info()
+    started = time.perf_counter()
+    result = _execute_query(query, params, arrow)
+    _record_query(caller, started, result, query, params)
+    return result
+
+# Independent queries are fanned out over a shared thread pool; each worker checks
+# out its own pooled connection, so keep this below the engine's pool_size (5).
+QUERY_WORKERS = int(os.getenv("QUERY_WORKERS", "4"))
+
+_query_executor = None
+_query_executor_lock = threading.Lock()
+
+def get_query_executor() -> ThreadPoolExecutor:
+    """Returns a singleton thread pool used to run independent queries concurrently."""
+    global _query_executor
+    with _query_executor_lock:
+        if _query_executor is None:
+            _query_executor = ThreadPoolExecutor(max_workers=QUERY_WORKERS, thread_name_prefix="query")
+    return _query_executor
+
+def run_concurrently(calls: list) -> list:
+    """
+    Runs a batch of independent `(func, *args)` calls concurrently and returns
+    their results in the same order. Latency is that of the slowest call.
+    """
+    executor = get_query_executor()
+    # Worker stacks have no page frames; carry the submitting page into each call
+    page = query_stats.caller_info()[1]
+    futures = [executor.submit(query_stats.caller_context(page).run, call[0], *call[1:]) for call in calls]
+    return [f.result() for f in futures]
+
+# --- Streaming queries ---
+# Full-history queries are read through a server-side cursor in bounded chunks, so
+# the driver never holds the whole result as Python rows. The reducers below consume
+# the chunks incrementally (the leverage rollup sync feeds `reduce_groupby_sum`); peak
+# memory is one chunk plus the reduced state.
+QUERY_CHUNK_ROWS = int(os.getenv("QUERY_CHUNK_ROWS", "50000"))
+
+def iter_query(query: str, params: Optional[dict] = None, chunksize: int = QUERY_CHUNK_ROWS, arrow: bool = False) -> Iterator[pd.DataFrame]:
+    """
+    Yields the result of `query` as DataFrame chunks. With `arrow=True` the chunks
+    are the driver's Arrow record batches (ADBC), converted to numpy dtypes. Unlike
+    `run_query`, errors are logged and re-raised: a stream cut short must not pass
+    for a complete result.
+    """
+    try:
+        if arrow and adbc_postgresql is not None:
+            sql, values = _to_positional(query, params or {})
+            with _adbc_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(sql, values or None)
+                    for batch in cur.fetch_record_batch():
+                        yield batch.to_pandas()
+            return
+        with get_engine().connect().execution_options(stream_results=True, max_row_buffer=chunksize) as conn:
+            for chunk in pd.read_sql(text(query), conn, params=params or None, chunksize=chunksize):
+                yield chunk
+    except Exception as e:
+        logging.error("Error streaming query: %s", str(e))
+        raise
+
+def reduce_sum(chunks, columns: list) -> pd.Series:
+    """Column totals over all chunks."""
+    total = pd.Series(0.0, index=columns)
+    for chunk in chunks:
+        total = total.add(chunk[columns].sum(), fill_value=0)
+    return total
+
+def reduce_groupby_sum(chunks, by: list, columns: list) -> pd.DataFrame:
+    """SUM(columns) GROUP BY `by` over all chunks, merging per-chunk partial sums."""
+    acc = None
+    for chunk in chunks:
+        part = chunk.groupby(by, sort=False, dropna=False)[columns].sum()
+        acc = part if acc is None else acc.add(part, fill_value=0)
+    if acc is None:
+        return pd.DataFrame(columns=by + columns)
+    return acc.reset_index()
+
+def iter_cumulative(chunks, column: str, by: Optional[str] = None, out: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """
+    Yields each chunk with a running total of `column` (per `by` group if given)
+    in `out`, carried over from the previous chunks. Chunks must arrive in order.
+    """
+    out = out or f"cumulative_{column}"
+    carry = {} if by else 0.0
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        if by is None:
+            running = chunk[column].cumsum() + carry
+            carry = running.iloc[-1]
+        else:
+            base = chunk[by].map(carry).fillna(0).astype("float64")
+            running = chunk.groupby(by, sort=False)[column].cumsum() + base
+            carry.update(running.groupby(chunk[by], sort=False).last().to_dict())
+        yield chunk.assign(**{out: running})
+
 def check_login(username, password):
     # This is a mock implementation. 
     # In a real app, you would hash the password and check against a database.
@@ -71,105 +263,188 @@ def check_login(username, password):
         logging.error("Error logging in: %s", str(e))
         return False, str(e), None
 
+@single_flight()
 def get_max_position_timestamp() -> Optional[int]:
     """
     Get the latest indexed timestamp from quant__kamino_user_position_split.
     """
     engine = get_engine()
+    started = time.perf_counter()
     try:
         query = "SELECT max(timestamp) FROM quant__kamino_user_position_split"
         with engine.connect() as conn:
             result = conn.execute(text(query))
             row = result.fetchone()
+            _, page = query_stats.caller_info()
+            query_stats.record(
+                "get_max_position_timestamp", page, time.perf_counter() - started, 1, 8,
+                explain=lambda: _explain(query),
+            )
             return row[0] if row else None
     except Exception as e:
         logging.error("Error fetching max timestamp: %s", str(e))
         return None
 
-def get_pyusd_main_positions(timestamp: int) -> pd.DataFrame:
-    query = """
-    SELECT * 
-    FROM quant__kamino_user_position_split 
-    WHERE lending_market_name = 'Main' 
-      AND (supply_symbol = 'PYUSD' OR borrow_symbol = 'PYUSD') 
-      AND "timestamp" = :timestamp
+POSITION_TABLE = "quant__kamino_user_position_split"
+
+def symbol_union(select: str, where: str, symbol_param: str = "asset_symbol", table: str = POSITION_TABLE) -> str:
+    """
+    Builds `SELECT {select} FROM {table} WHERE {where} AND (supply_symbol = :p OR
+    borrow_symbol = :p)` as two index-able branches joined by UNION ALL: one on
+    supply_symbol and one on borrow_symbol. The borrow branch skips rows the supply
+    branch already returned (supply_symbol IS DISTINCT FROM :p), so every row
+    appears once without the sort/hash of a plain UNION.
+    """
+    select = select.strip()
+    return f"""
+    SELECT {select}
+    FROM {table}
+    WHERE {where}
+      AND supply_symbol = :{symbol_param}
+    UNION ALL
+    SELECT {select}
+    FROM {table}
+    WHERE {where}
+      AND borrow_symbol = :{symbol_param}
+      AND supply_symbol IS DISTINCT FROM :{symbol_param}
     """
-    return run_query(query, params={"timestamp": timestamp})
 
-def get_asset_positions(timestamp: int, market_name: str, asset_symbol: str) -> pd.DataFrame:
-    query = """
-    SELECT obligation_id, owner, supply_symbol, supply_value, borrow_symbol, borrow_value 
-    FROM quant__kamino_user_position_split 
-    WHERE lending_market_name = :market_name 
-      AND (supply_symbol = :asset_symbol OR borrow_symbol = :asset_symbol) 
-      AND "timestamp" = :timestamp
-    """
-    return run_query(query, params={
-        "timestamp": timestamp,
-        "market_name": market_name,
-        "asset_symbol": asset_symbol
-    })
+def get_pyusd_main_positions(timestamp: int) -> pd.DataFrame:
+    query = symbol_union("*", 'lending_market_name = :market_name AND "timestamp" = :timestamp')
+    return run_query(query, params={"market_name": "Main", "asset_symbol": "PYUSD", "timestamp": timestamp}, arrow=True)
 
-def get_position_details(timestamp: int, market_name: str, asset_symbol: str) -> pd.DataFrame:
+# --- Position snapshot store ---
+# Every per-asset query below reads the same `max(timestamp)` snapshot. Instead of
+# scanning quant__kamino_user_position_split once per query, the snapshot is loaded
+# once per new timestamp and the queries are answered from memory.
+
+SNAPSHOT_CATEGORY_COLUMNS = ["lending_market_name", "supply_symbol", "borrow_symbol"]
+SNAPSHOT_VALUE_COLUMNS = ["supply_value", "borrow_value", "supply_lt", "borrow_factor"]
+SNAPSHOT_COLUMNS = ["obligation_id", "owner"] + SNAPSHOT_CATEGORY_COLUMNS + SNAPSHOT_VALUE_COLUMNS
+SNAPSHOT_MAX_ENTRIES = 2  # latest snapshot plus the previous one while a new tick rolls out
+
+_snapshots = OrderedDict()
+_snapshot_lock = threading.Lock()
+
+def load_position_snapshot(timestamp: int) -> pd.DataFrame:
     """
-    Get detailed position data including Health Factor.
+    Loads every position of a snapshot into a compact columnar frame
+    (categorical market/symbol columns, float64 values).
     """
     query = """
-    SELECT
-        owner,
-        obligation_id,
-        supply_symbol,
-        supply_value,
-        borrow_symbol,
-        borrow_value,
-        CASE
-          WHEN supply_value = 0 OR borrow_value = 0 OR borrow_factor = 0 THEN NULL
-          ELSE ((supply_lt/borrow_factor)/(borrow_value/supply_value))
-        END AS health_factor
+    SELECT lending_market_name, obligation_id, owner,
+           supply_symbol, supply_value, borrow_symbol, borrow_value,
+           supply_lt, borrow_factor
     FROM quant__kamino_user_position_split
-    WHERE lending_market_name = :market_name
-      AND (borrow_symbol = :asset_symbol OR supply_symbol = :asset_symbol)
-      AND "timestamp" = :timestamp
-      AND borrow_factor > 0
-    ORDER BY health_factor ASC
-    """
-    return run_query(query, params={
-        "timestamp": timestamp,
-        "market_name": market_name,
-        "asset_symbol": asset_symbol
-    })
+    WHERE "timestamp" = :timestamp
+    """
+    df = run_query(query, params={"timestamp": timestamp})
+    if df.empty:
+        return df
+    for c in SNAPSHOT_CATEGORY_COLUMNS:
+        df[c] = df[c].astype("category")
+    for c in SNAPSHOT_VALUE_COLUMNS:
+        df[c] = pd.to_numeric(df[c], errors="coerce").astype("float64")
+    return df
+
+@single_flight(copy_result=False)
+def _load_snapshot_once(timestamp: int) -> pd.DataFrame:
+    # Sessions asking for the same new snapshot share one load; the frame is stored
+    # read-only in `_snapshots`, so it is not copied for followers
+    return load_position_snapshot(timestamp)
+
+def get_position_snapshot(timestamp: int) -> pd.DataFrame:
+    """
+    Returns the in-memory snapshot for `timestamp`, loading it on first use.
+    Failed (empty) loads are not cached so the next call retries.
+    """
+    with _snapshot_lock:
+        if timestamp in _snapshots:
+            _snapshots.move_to_end(timestamp)
+            return _snapshots[timestamp]
+    df = _load_snapshot_once(timestamp)
+    if not df.empty:
+        with _snapshot_lock:
+            _snapshots[timestamp] = df
+            _snapshots.move_to_end(timestamp)
+            while len(_snapshots) > SNAPSHOT_MAX_ENTRIES:
+                _snapshots.popitem(last=False)
+    return df
+
+def _market_rows(timestamp: int, market_name: str) -> pd.DataFrame:
+    """Rows of the snapshot belonging to one lending market."""
+    snap = get_position_snapshot(timestamp)
+    if snap.empty:
+        return pd.DataFrame(columns=SNAPSHOT_COLUMNS)
+    return snap[snap["lending_market_name"] == market_name]
+
+def _as_result(df: pd.DataFrame, columns: list) -> pd.DataFrame:
+    """Projects `columns` and turns categoricals back into plain object columns."""
+    out = df[columns].reset_index(drop=True)
+    for c in columns:
+        if isinstance(out[c].dtype, pd.CategoricalDtype):
+            out[c] = out[c].astype(object)
+    return out
+
+def _sum_by_pair(df: pd.DataFrame) -> pd.DataFrame:
+    """SUM(supply_value), SUM(borrow_value) GROUP BY supply_symbol, borrow_symbol."""
+    return (
+        df.groupby(["supply_symbol", "borrow_symbol"], observed=True, dropna=False, sort=False)[["supply_value", "borrow_value"]]
+        .sum(min_count=1)
+        .reset_index()
+    )
+
+def _ratio(num: pd.Series, denom: pd.Series) -> pd.Series:
+    """num / denom, NaN where denom is zero."""
+    return (num / denom.where(denom != 0)).astype("float64")
 
-def get_position_at_risk_data(market_name: str, asset_symbol: str, threshold: float = 1.1) -> pd.DataFrame:
+def get_asset_positions(timestamp: int, market_name: str, asset_symbol: str) -> pd.DataFrame:
+    df = _market_rows(timestamp, market_name)
+    df = df[(df["supply_symbol"] == asset_symbol) | (df["borrow_symbol"] == asset_symbol)]
+    return _as_result(df, ["obligation_id", "owner", "supply_symbol", "supply_value", "borrow_symbol", "borrow_value"])
+
+def get_position_details(timestamp: int, market_name: str, asset_symbol: str) -> pd.DataFrame:
     """
-    Get Position at Risk data (Value at Risk based on HF threshold).
+    Get detailed position data including Health Factor.
     """
-    query = """
-    WITH position_metrics AS (
-      SELECT
+    df = _market_rows(timestamp, market_name)
+    df = df[
+        ((df["borrow_symbol"] == asset_symbol) | (df["supply_symbol"] == asset_symbol))
+        & (df["borrow_factor"] > 0)
+    ]
+    invalid = (df["supply_value"] == 0) | (df["borrow_value"] == 0) | (df["borrow_factor"] == 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hf = (df["supply_lt"] / df["borrow_factor"]) / (df["borrow_value"] / df["supply_value"])
+    df = df.assign(health_factor=hf.mask(invalid))
+    df = df.sort_values("health_factor", ascending=True, na_position="last", kind="stable")
+    return _as_result(df, ["owner", "obligation_id", "supply_symbol", "supply_value", "borrow_symbol", "borrow_value", "health_factor"])
+
+POSITION_METRICS_SELECT = """
         lending_market_name,
         obligation_id,
         "timestamp",
-        
         supply_symbol,
         supply_value,
-        
         borrow_symbol,
         borrow_value,
-        
         borrow_factor,
         supply_lt,
-        
         CASE
           WHEN supply_value = 0 OR borrow_value = 0 OR borrow_factor = 0 THEN NULL
           ELSE ((supply_lt/borrow_factor)/(borrow_value/supply_value))
         END AS health_factor
-        
-      FROM public.quant__kamino_user_position_split
-      WHERE lending_market_name = :market_name
-        AND borrow_factor > 0
-        AND (borrow_symbol = :asset_symbol OR supply_symbol = :asset_symbol)
-    ),
-    
+"""
+POSITION_METRICS_WHERE = "lending_market_name = :market_name AND borrow_factor > 0"
+
+def get_position_at_risk_data(market_name: str, asset_symbol: str, threshold: float = 1.1, since: Optional[int] = None) -> pd.DataFrame:
+    """
+    Get Position at Risk data (Value at Risk based on HF threshold).
+    If `since` is given, only timestamps >= since are aggregated.
+    """
+    since_filter = ' AND "timestamp" >= :since' if since is not None else ""
+    query = f"""
+    WITH position_metrics AS ({symbol_union(POSITION_METRICS_SELECT, POSITION_METRICS_WHERE + since_filter)}),
+
     asset_positions AS (
       SELECT
         *,
@@ -259,164 +534,109 @@ def get_position_at_risk_data(market_name: str, asset_symbol: str, threshold: fl
     FROM aggregated_metrics
     ORDER BY "timestamp" ASC
     """
-    return run_query(query, params={
+    params = {
         "market_name": market_name,
         "asset_symbol": asset_symbol,
         "threshold": threshold
-    })
+    }
+    if since is not None:
+        params["since"] = since
+    return run_query(query, params=params)
 
 def get_debt_distribution(timestamp: int, market_name: str, asset_symbol: str) -> pd.DataFrame:
     """
     Row 1: Debt distribution backed by [ASSET] collateral.
     Returns: supply_symbol, supply_value, borrow_symbol
     """
-    query = """
-    SELECT supply_symbol, SUM(supply_value) as supply_value, borrow_symbol, SUM(borrow_value) as borrow_value
-    FROM quant__kamino_user_position_split 
-    WHERE lending_market_name = :market_name 
-      AND supply_symbol = :asset_symbol 
-      AND "timestamp" = :timestamp
-      AND borrow_symbol IS NOT NULL 
-      AND borrow_symbol != ''
-    GROUP BY borrow_symbol, supply_symbol
-    """
-    return run_query(query, params={
-        "timestamp": timestamp,
-        "market_name": market_name,
-        "asset_symbol": asset_symbol
-    })
+    df = _market_rows(timestamp, market_name)
+    borrow = df["borrow_symbol"].astype(object)
+    df = df[(df["supply_symbol"] == asset_symbol) & borrow.notna() & (borrow != "")]
+    return _as_result(_sum_by_pair(df), ["supply_symbol", "supply_value", "borrow_symbol", "borrow_value"])
 
 def get_collateral_distribution(timestamp: int, market_name: str, asset_symbol: str) -> pd.DataFrame:
     """
     Row 2: Collateral distribution backing [ASSET] debt.
     Returns: borrow_symbol, borrow_value, supply_symbol
     """
-    query = """
-    SELECT borrow_symbol, SUM(borrow_value) as borrow_value, supply_symbol, SUM(supply_value) as supply_value
-    FROM quant__kamino_user_position_split 
-    WHERE lending_market_name = :market_name 
-      AND borrow_symbol = :asset_symbol 
-      AND "timestamp" = :timestamp
-    GROUP BY supply_symbol, borrow_symbol
-    """
-    return run_query(query, params={
-        "timestamp": timestamp,
-        "market_name": market_name,
-        "asset_symbol": asset_symbol
-    })
+    df = _market_rows(timestamp, market_name)
+    df = df[df["borrow_symbol"] == asset_symbol]
+    return _as_result(_sum_by_pair(df), ["borrow_symbol", "borrow_value", "supply_symbol", "supply_value"])
+
+def get_asset_distributions(timestamp: int, market_name: str, asset_symbol: str) -> tuple:
+    """
+    get_asset_positions, get_debt_distribution and get_collateral_distribution in one
+    pass: the market's rows touching [ASSET] are selected once and grouped once by
+    (supply_symbol, borrow_symbol); both distributions are slices of that grouping.
+    Returns (positions, debt distribution, collateral distribution).
+    """
+    df = _market_rows(timestamp, market_name)
+    is_supply = (df["supply_symbol"] == asset_symbol).to_numpy()
+    is_borrow = (df["borrow_symbol"] == asset_symbol).to_numpy()
+    df = df[is_supply | is_borrow]
+    positions = _as_result(df, ["obligation_id", "owner", "supply_symbol", "supply_value", "borrow_symbol", "borrow_value"])
+
+    pairs = _sum_by_pair(df)
+    borrow = pairs["borrow_symbol"].astype(object)
+    debt = pairs[(pairs["supply_symbol"] == asset_symbol) & borrow.notna() & (borrow != "")]
+    collateral = pairs[pairs["borrow_symbol"] == asset_symbol]
+    return (
+        positions,
+        _as_result(debt, ["supply_symbol", "supply_value", "borrow_symbol", "borrow_value"]),
+        _as_result(collateral, ["borrow_symbol", "borrow_value", "supply_symbol", "supply_value"]),
+    )
 
 def get_leverage_borrowed(timestamp: int, market_name: str, asset_symbol: str, min_value: float) -> pd.DataFrame:
     """
     Table 1: Pairs where [ASSET] is Borrowed
     """
-    query = """
-    SELECT borrow_symbol, supply_symbol, borrow_value/supply_value AS LTV 
-    FROM ( 
-        SELECT borrow_symbol, SUM(borrow_value) as borrow_value, supply_symbol, SUM(supply_value) as supply_value 
-        FROM quant__kamino_user_position_split 
-        WHERE lending_market_name = :market_name 
-        AND borrow_symbol = :asset_symbol 
-        AND "timestamp" = :timestamp
-        GROUP BY supply_symbol, borrow_symbol 
-    ) AS sub
-    WHERE borrow_value >= :min_value
-    """
-    return run_query(query, params={
-        "timestamp": timestamp,
-        "market_name": market_name,
-        "asset_symbol": asset_symbol,
-        "min_value": min_value
-    })
-
-def get_historic_leverage_where_asset_is_collateral(market_name: str, asset_symbol: str, min_value: float) -> pd.DataFrame:
-    """
-    Historic LTV where [ASSET] is Collateral (supply_symbol = asset).
-    Returns: timestamp, borrow_symbol, supply_symbol, LTV
-    """
-    query = """
-    SELECT "timestamp", borrow_symbol, supply_symbol, borrow_value/supply_value AS LTV
-    FROM (
-        SELECT "timestamp", borrow_symbol, SUM(borrow_value) as borrow_value, supply_symbol, SUM(supply_value) as supply_value
-        FROM quant__kamino_user_position_split
-        WHERE lending_market_name = :market_name AND supply_symbol = :asset_symbol
-        GROUP BY supply_symbol, "timestamp", borrow_symbol
-    ) AS subquery
-    WHERE borrow_value >= :min_value
-    """
-    return run_query(query, params={
-        "market_name": market_name,
-        "asset_symbol": asset_symbol,
-        "min_value": min_value
-    })
+    df = _market_rows(timestamp, market_name)
+    sub = _sum_by_pair(df[df["borrow_symbol"] == asset_symbol])
+    sub = sub[sub["borrow_value"] >= min_value]
+    sub = sub.assign(ltv=_ratio(sub["borrow_value"], sub["supply_value"]))
+    return _as_result(sub, ["borrow_symbol", "supply_symbol", "ltv"])
 
-def get_historic_leverage_where_asset_is_borrowed(market_name: str, asset_symbol: str, min_value: float) -> pd.DataFrame:
+def get_leverage_collateral(timestamp: int, market_name: str, asset_symbol: str, min_value: float) -> pd.DataFrame:
     """
-    Historic LTV where [ASSET] is Borrowed (borrow_symbol = asset).
-    Returns: timestamp, borrow_symbol, supply_symbol, LTV
+    Table 2: Pairs where [ASSET] is Collateral
     """
-    query = """
-    SELECT "timestamp", borrow_symbol, supply_symbol, borrow_value/supply_value AS LTV
-    FROM (
-        SELECT "timestamp", borrow_symbol, SUM(borrow_value) as borrow_value, supply_symbol, SUM(supply_value) as supply_value
-        FROM quant__kamino_user_position_split
-        WHERE lending_market_name = :market_name AND borrow_symbol = :asset_symbol
-        GROUP BY supply_symbol, "timestamp", borrow_symbol
-    ) AS subquery
-    WHERE borrow_value >= :min_value
-    """
-    return run_query(query, params={
-        "market_name": market_name,
-        "asset_symbol": asset_symbol,
-        "min_value": min_value
-    })
+    df = _market_rows(timestamp, market_name)
+    sub = _sum_by_pair(df[df["supply_symbol"] == asset_symbol])
+    sub = sub[sub["borrow_value"] >= min_value]
+    sub = sub.assign(ltv=_ratio(sub["borrow_value"], sub["supply_value"]))
+    return _as_result(sub, ["borrow_symbol", "supply_symbol", "ltv"])
 
-def get_leverage_collateral(timestamp: int, market_name: str, asset_symbol: str, min_value: float) -> pd.DataFrame:
+def get_market_positions(timestamp: int, market_name: str) -> pd.DataFrame:
     """
-    Table 2: Pairs where [ASSET] is Collateral
+    Every borrowing position of a market, with the inputs of its health factor.
+    Returns: supply_symbol, supply_value, borrow_symbol, borrow_value, supply_lt, borrow_factor
     """
-    query = """
-    SELECT borrow_symbol, supply_symbol, borrow_value/supply_value AS LTV 
-    FROM ( 
-        SELECT supply_symbol, SUM(supply_value) as supply_value, borrow_symbol, SUM(borrow_value) as borrow_value 
-        FROM quant__kamino_user_position_split 
-        WHERE lending_market_name = :market_name 
-          AND supply_symbol = :asset_symbol 
-          AND "timestamp" = :timestamp
-        GROUP BY supply_symbol, borrow_symbol 
-    ) AS sub
-    WHERE borrow_value >= :min_value
-    """
-    return run_query(query, params={
-        "timestamp": timestamp,
-        "market_name": market_name,
-        "asset_symbol": asset_symbol,
-        "min_value": min_value
-    })
+    df = _market_rows(timestamp, market_name)
+    df = df[df["borrow_factor"] > 0]
+    return _as_result(df, ["supply_symbol", "supply_value", "borrow_symbol", "borrow_value", "supply_lt", "borrow_factor"])
 
 def get_liquidation_risk_data(timestamp: int, market_name: str, asset_symbol: str) -> pd.DataFrame:
     """
     Get data for liquidation risk analysis.
     """
-    query = """
-    SELECT borrow_symbol, borrow_value, supply_symbol, supply_value 
-    , CASE WHEN supply_value = 0 THEN 0 ELSE borrow_value/supply_value END AS LTV 
-    , CASE WHEN borrow_factor = 0 THEN 0 ELSE supply_lt/borrow_factor END AS LLTV 
-    , CASE 
-        WHEN supply_value = 0 OR borrow_factor = 0 OR supply_lt = 0 THEN NULL 
-        ELSE 1-((borrow_value/supply_value)/(supply_lt/borrow_factor)) 
-      END AS collateral_liquidation_price_shock 
-    , CASE 
-        WHEN supply_value = 0 OR borrow_value = 0 OR borrow_factor = 0 THEN NULL 
-        ELSE ((supply_lt/borrow_factor)/(borrow_value/supply_value))-1 
-      END AS borrow_liquidation_price_shock 
-    FROM quant__kamino_user_position_split 
-    WHERE lending_market_name = :market_name 
-      AND "timestamp" = :timestamp 
-      AND borrow_factor > 0 
-      AND (borrow_symbol = :asset_symbol OR supply_symbol = :asset_symbol)
-    """
-    return run_query(query, params={
-        "timestamp": timestamp,
-        "market_name": market_name,
-        "asset_symbol": asset_symbol
-    })
+    df = _market_rows(timestamp, market_name)
+    df = df[
+        (df["borrow_factor"] > 0)
+        & ((df["borrow_symbol"] == asset_symbol) | (df["supply_symbol"] == asset_symbol))
+    ]
+    supply, borrow = df["supply_value"], df["borrow_value"]
+    lt, bf = df["supply_lt"], df["borrow_factor"]
+    ltv = _ratio(borrow, supply)
+    lltv = _ratio(lt, bf)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        collateral_shock = (1 - ltv / lltv).mask((supply == 0) | (bf == 0) | (lt == 0))
+        borrow_shock = (lltv / ltv - 1).mask((supply == 0) | (borrow == 0) | (bf == 0))
+    df = df.assign(
+        ltv=ltv.where(supply != 0, 0.0),
+        lltv=lltv.where(bf != 0, 0.0),
+        collateral_liquidation_price_shock=collateral_shock,
+        borrow_liquidation_price_shock=borrow_shock,
+    )
+    return _as_result(df, [
+        "borrow_symbol", "borrow_value", "supply_symbol", "supply_value", "ltv", "lltv",
+        "collateral_liquidation_price_shock", "borrow_liquidation_price_shock",
+    ])
@@ -0,0 +1,184 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+import weakref
+import aiohttp
+import requests
+from typing import Optional
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from src.singleflight import single_flight
+
+# Shared HTTP client for the Kamino and Sentora APIs: one pooled keep-alive session,
+# exponential backoff with full jitter, a per-host concurrency limit and a per-host
+# circuit breaker so a degraded API fails fast instead of burning retries on every page.
+
+MAX_ATTEMPTS = 3
+BACKOFF_BASE = 0.5  # seconds; attempt n sleeps uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**n))
+BACKOFF_MAX = 8.0
+PER_HOST_CONCURRENCY = int(os.getenv("HTTP_PER_HOST_CONCURRENCY", "4"))
+BREAKER_FAILURE_THRESHOLD = 5  # consecutive failed requests before the breaker opens
+BREAKER_RESET_TIMEOUT = 60.0  # seconds the breaker stays open before letting a trial request through
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+class CircuitOpenError(requests.RequestException):
+    """Raised without touching the network while a host's circuit breaker is open."""
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker (closed -> open -> half-open)."""
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started_at = None  # set while the single half-open probe is in flight
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            now = time.monotonic()
+            if self.trial_started_at is not None:
+                # Half-open with a probe in flight: everyone else keeps failing fast, unless
+                # the probe never reported back (then a new one may go)
+                if now - self.trial_started_at < self.reset_timeout:
+                    return False
+            elif now - self.opened_at < self.reset_timeout:
+                return False
+            self.trial_started_at = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_started_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.trial_started_at is not None:
+                # The half-open probe failed: stay open for another reset period
+                self.trial_started_at = None
+                self.opened_at = time.monotonic()
+                logging.warning("Circuit breaker re-opened after a failed trial request")
+            elif self.failures >= self.failure_threshold and self.opened_at is None:
+                self.opened_at = time.monotonic()
+                logging.warning("Circuit breaker opened after %d consecutive failures", self.failures)
+
+_session = None
+_session_lock = threading.Lock()
+_breakers = {}
+_host_semaphores = {}
+_async_host_semaphores = weakref.WeakKeyDictionary()  # event loop -> {host: asyncio.Semaphore}
+_host_lock = threading.Lock()
+
+def get_session() -> requests.Session:
+    """Returns a singleton pooled requests session (keep-alive and TLS session reuse)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=PER_HOST_CONCURRENCY * 2, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+    return _session
+
+def _host(url: str) -> str:
+    return urlsplit(url).netloc
+
+def get_breaker(host: str) -> CircuitBreaker:
+    with _host_lock:
+        return _breakers.setdefault(host, CircuitBreaker())
+
+def _host_semaphore(host: str) -> threading.BoundedSemaphore:
+    with _host_lock:
+        return _host_semaphores.setdefault(host, threading.BoundedSemaphore(PER_HOST_CONCURRENCY))
+
+def _async_host_semaphore(host: str) -> asyncio.Semaphore:
+    """Per-host limit for async fetches; asyncio primitives are bound to a loop, so one set per running loop."""
+    loop = asyncio.get_running_loop()
+    with _host_lock:
+        return _async_host_semaphores.setdefault(loop, {}).setdefault(host, asyncio.Semaphore(PER_HOST_CONCURRENCY))
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for the given (0-based) attempt."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+def _is_retryable(e: Exception) -> bool:
+    if isinstance(e, requests.HTTPError) and e.response is not None:
+        return e.response.status_code in RETRYABLE_STATUS
+    return isinstance(e, (requests.ConnectionError, requests.Timeout))
+
+@single_flight()
+def get_json(url: str, timeout=(5, 25), attempts: int = MAX_ATTEMPTS):
+    """
+    GETs `url` through the shared session and returns the decoded JSON body.
+    Retries transient failures with backoff; raises the last error (a
+    requests.RequestException) once attempts are exhausted or the breaker is open.
+    Concurrent requests for the same URL share one download (treat the body as read-only).
+    """
+    host = _host(url)
+    breaker = get_breaker(host)
+    last_err = None
+    for attempt in range(attempts):
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit open for {host}")
+        try:
+            with _host_semaphore(host):
+                r = get_session().get(url, timeout=timeout)
+            r.raise_for_status()
+            data = r.json()
+            breaker.record_success()
+            return data
+        except requests.RequestException as e:
+            last_err = e
+            if not _is_retryable(e):
+                # The host answered; a 4xx says nothing about its health
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+        if attempt < attempts - 1:
+            time.sleep(backoff_delay(attempt))
+    raise last_err
+
+async def get_json_async(session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, url: str, attempts: int = MAX_ATTEMPTS) -> Optional[dict]:
+    """
+    Async counterpart of `get_json` for batch fetches; shares the per-host circuit
+    breakers and applies the per-host concurrency limit. `semaphore` additionally
+    bounds concurrency for the batch. Returns None on failure.
+    """
+    host = _host(url)
+    breaker = get_breaker(host)
+    host_semaphore = _async_host_semaphore(host)
+    last_err = None
+    for attempt in range(attempts):
+        if not breaker.allow():
+            last_err = CircuitOpenError(f"Circuit open for {host}")
+            break
+        try:
+            async with semaphore, host_semaphore:
+                async with session.get(url) as r:
+                    r.raise_for_status()
+                    data = await r.json()
+            breaker.record_success()
+            return data
+        except aiohttp.ClientResponseError as e:
+            last_err = e
+            if e.status not in RETRYABLE_STATUS:
+                breaker.record_success()
+                break
+            breaker.record_failure()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            last_err = e
+            breaker.record_failure()
+        if attempt < attempts - 1:
+            await asyncio.sleep(backoff_delay(attempt))
+    logging.error("Error fetching %s: %s", url, str(last_err))
+    return None
@@ -0,0 +1,140 @@
+import os
+import re
+import logging
+import threading
+import pandas as pd
+from typing import Optional
+from src.database import iter_query, reduce_groupby_sum, POSITION_TABLE
+
+# Hourly and daily rollups of per-pair supply/borrow sums, persisted per market, so the
+# historic leverage charts never aggregate the full position history on a page load.
+# Each rollup row holds the sums over every snapshot in its bucket plus the number of
+# snapshots the pair appeared in, so averages (and the debt threshold) stay exact.
+STORE_DIR = os.getenv("LEVERAGE_ROLLUP_STORE_DIR", os.path.join(".cache", "leverage_rollups"))
+RESOLUTIONS = {"hourly": 3600, "daily": 86400}
+# Points per series the LTV charts can show legibly; spans needing more hourly buckets use daily
+CHART_MAX_POINTS = int(os.getenv("LEVERAGE_CHART_MAX_POINTS", "1500"))
+
+ROLLUP_KEYS = ["bucket", "supply_symbol", "borrow_symbol"]
+ROLLUP_VALUES = ["supply_value", "borrow_value", "snapshots"]
+
+_frames = {}
+_locks = {}
+_locks_guard = threading.Lock()
+
+def _lock_for(market_name: str) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(market_name, threading.Lock())
+
+def _store_path(market_name: str, resolution: str) -> str:
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", market_name)
+    return os.path.join(STORE_DIR, f"{safe}_{resolution}.parquet")
+
+def _read_store(market_name: str, resolution: str) -> pd.DataFrame:
+    key = (market_name, resolution)
+    if key in _frames:
+        return _frames[key]
+    path = _store_path(market_name, resolution)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=ROLLUP_KEYS + ROLLUP_VALUES)
+    try:
+        df = pd.read_parquet(path)
+    except Exception as e:
+        logging.error("Error reading leverage rollup %s: %s", path, str(e))
+        return pd.DataFrame(columns=ROLLUP_KEYS + ROLLUP_VALUES)
+    _frames[key] = df
+    return df
+
+def _write_store(market_name: str, resolution: str, df: pd.DataFrame):
+    _frames[(market_name, resolution)] = df
+    path = _store_path(market_name, resolution)
+    try:
+        os.makedirs(STORE_DIR, exist_ok=True)
+        tmp_path = path + ".tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logging.error("Error writing leverage rollup %s: %s", path, str(e))
+
+def _rebucket(df: pd.DataFrame, seconds: int) -> pd.DataFrame:
+    """Rolls rows (snapshot pair sums or a finer rollup) up into `seconds`-wide buckets."""
+    df = df.assign(bucket=(df["bucket"].astype("int64") // seconds) * seconds)
+    return df.groupby(ROLLUP_KEYS, sort=False, dropna=False)[ROLLUP_VALUES].sum().reset_index()
+
+def _pair_sums_since(market_name: str, since: Optional[int]):
+    """Streams per-snapshot pair sums of `market_name` at or after `since`, already bucketed hourly."""
+    since_filter = 'AND "timestamp" >= :since' if since is not None else ""
+    query = f"""
+    SELECT "timestamp" AS bucket, supply_symbol, borrow_symbol,
+           SUM(supply_value) AS supply_value, SUM(borrow_value) AS borrow_value, 1 AS snapshots
+    FROM {POSITION_TABLE}
+    WHERE lending_market_name = :market_name {since_filter}
+    GROUP BY "timestamp", supply_symbol, borrow_symbol
+    """
+    params = {"market_name": market_name}
+    if since is not None:
+        params["since"] = since
+    for chunk in iter_query(query, params):
+        chunk = chunk.astype({"supply_value": "float64", "borrow_value": "float64", "snapshots": "int64"})
+        yield _rebucket(chunk, RESOLUTIONS["hourly"])
+
+def _replace_from(stored: pd.DataFrame, fresh: pd.DataFrame, since: Optional[int]) -> pd.DataFrame:
+    kept = stored if since is None else stored[stored["bucket"] < since]
+    combined = pd.concat([kept, fresh], ignore_index=True) if not kept.empty else fresh
+    return combined.sort_values("bucket", kind="stable").reset_index(drop=True)
+
+def update_rollups(market_name: str) -> bool:
+    """
+    Brings the hourly and daily rollups of a market up to date. Only the newest hour
+    (which may have been partially indexed last time) and anything after it is
+    re-aggregated from the position table; the daily rollup is rebuilt from hourly
+    buckets for the days that changed. Returns False if the source query failed.
+    """
+    with _lock_for(market_name):
+        hourly = _read_store(market_name, "hourly")
+        since = None if hourly.empty else int(hourly["bucket"].max())
+        try:
+            fresh = reduce_groupby_sum(_pair_sums_since(market_name, since), ROLLUP_KEYS, ROLLUP_VALUES)
+        except Exception as e:
+            logging.error("Error updating leverage rollups for %s: %s", market_name, str(e))
+            return False
+        if fresh.empty:
+            return True
+        fresh = fresh.astype({"bucket": "int64", "snapshots": "int64"})
+        hourly = _replace_from(hourly, fresh, since)
+        _write_store(market_name, "hourly", hourly)
+
+        day = RESOLUTIONS["daily"]
+        day_since = None if since is None else (since // day) * day
+        changed = hourly if day_since is None else hourly[hourly["bucket"] >= day_since]
+        daily = _replace_from(_read_store(market_name, "daily"), _rebucket(changed, day), day_since)
+        _write_store(market_name, "daily", daily)
+        return True
+
+def pick_resolution(market_name: str, max_points: int = CHART_MAX_POINTS) -> str:
+    """Finest resolution whose number of buckets over the stored history fits `max_points`."""
+    hourly = _read_store(market_name, "hourly")
+    if hourly.empty:
+        return "hourly"
+    span = int(hourly["bucket"].max()) - int(hourly["bucket"].min())
+    return "hourly" if span // RESOLUTIONS["hourly"] + 1 <= max_points else "daily"
+
+def get_historic_leverage(market_name: str, asset_symbol: str, min_value: float, side: str, resolution: str) -> pd.DataFrame:
+    """
+    Historic LTV per pair from a rollup, where [ASSET] is `side` ("collateral" or
+    "borrowed"). LTV is the bucket's borrow sum over its supply sum; the debt
+    threshold applies to the pair's average borrow value over the bucket's snapshots.
+    Returns: timestamp, borrow_symbol, supply_symbol, ltv (same shape as the SQL version).
+    """
+    df = _read_store(market_name, resolution)
+    column = "supply_symbol" if side == "collateral" else "borrow_symbol"
+    df = df[df[column] == asset_symbol]
+    avg_borrow = df["borrow_value"] / df["snapshots"]
+    df = df[avg_borrow >= min_value]
+    ltv = df["borrow_value"] / df["supply_value"].where(df["supply_value"] != 0)
+    return pd.DataFrame({
+        "timestamp": df["bucket"].to_numpy(),
+        "borrow_symbol": df["borrow_symbol"].to_numpy(),
+        "supply_symbol": df["supply_symbol"].to_numpy(),
+        "ltv": ltv.to_numpy(),
+    })
@@ -0,0 +1,151 @@
+"""
+Index migrations for quant__kamino_user_position_split.
+
+    python -m src.migrations check   # report missing/invalid/mismatched indexes, exit 1 if any
+    python -m src.migrations apply   # create missing indexes (CONCURRENTLY) and verify them
+
+Indexes are created with CREATE INDEX CONCURRENTLY so the indexer keeps writing while
+they build. DDL usually needs a different role than the dashboard's read-only user;
+set MIGRATIONS_DATABASE_URL to run with one.
+"""
+import os
+import re
+import sys
+import logging
+import argparse
+from sqlalchemy import create_engine, text
+from src.database import get_db_url, POSITION_TABLE
+
+# Each index names the queries whose access path it serves (src.database unless qualified)
+INDEXES = [
+    {
+        "name": "ix_kups_timestamp",
+        "columns": '("timestamp")',
+        "used_by": ["get_max_position_timestamp", "load_position_snapshot"],
+    },
+    {
+        "name": "ix_kups_market_ts_supply",
+        "columns": '(lending_market_name, "timestamp", supply_symbol)',
+        "used_by": ["get_pyusd_main_positions"],
+    },
+    {
+        "name": "ix_kups_market_ts_borrow",
+        "columns": '(lending_market_name, "timestamp", borrow_symbol)',
+        "used_by": ["get_pyusd_main_positions"],
+    },
+    {
+        # Covering index: the rollup delta sync's per-timestamp pair sums are answered from the index alone
+        "name": "ix_kups_market_ts_pairs",
+        "columns": '(lending_market_name, "timestamp")',
+        "include": "(supply_symbol, borrow_symbol, supply_value, borrow_value)",
+        "used_by": ["leverage_rollups.update_rollups"],
+    },
+    {
+        # Partial: position-at-risk only ever looks at rows with a borrow factor
+        "name": "ix_kups_at_risk_supply",
+        "columns": '(lending_market_name, supply_symbol, "timestamp")',
+        "include": "(obligation_id, supply_value, borrow_value, supply_lt, borrow_factor)",
+        "where": "borrow_factor > 0",
+        "used_by": ["get_position_at_risk_data"],
+    },
+    {
+        "name": "ix_kups_at_risk_borrow",
+        "columns": '(lending_market_name, borrow_symbol, "timestamp")',
+        "include": "(obligation_id, supply_value, borrow_value, supply_lt, borrow_factor)",
+        "where": "borrow_factor > 0",
+        "used_by": ["get_position_at_risk_data"],
+    },
+]
+
+def get_migration_engine():
+    return create_engine(os.getenv("MIGRATIONS_DATABASE_URL") or get_db_url(), pool_pre_ping=True)
+
+def create_statement(index: dict) -> str:
+    sql = f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {index["name"]} ON {POSITION_TABLE} {index["columns"]}'
+    if index.get("include"):
+        sql += f' INCLUDE {index["include"]}'
+    if index.get("where"):
+        sql += f' WHERE {index["where"]}'
+    return sql
+
+def existing_indexes(conn) -> dict:
+    """{index name: (is valid, definition as reported by pg_get_indexdef)} for the position table."""
+    rows = conn.execute(text("""
+        SELECT c.relname, i.indisvalid, pg_get_indexdef(i.indexrelid)
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        JOIN pg_class t ON t.oid = i.indrelid
+        WHERE t.relname = :table
+    """), {"table": POSITION_TABLE}).fetchall()
+    return {name: (valid, definition) for name, valid, definition in rows}
+
+# pg_get_indexdef output: CREATE INDEX name ON table USING btree (cols) [INCLUDE (cols)] [WHERE pred]
+_INDEXDEF = re.compile(r"USING \w+ \((?P<columns>.*?)\)(?: INCLUDE \((?P<include>.*?)\))?(?: WHERE (?P<where>.*))?$")
+_CAST = re.compile(r"::(?:double precision|character varying|timestamp with(?:out)? time zone|\w+)(?:\[\])?")
+
+def _normalize(sql) -> str:
+    """Drops what Postgres adds when it prints an index back: casts, parentheses, quotes, spacing."""
+    if not sql:
+        return ""
+    return re.sub(r'[\s()"]', "", _CAST.sub("", sql)).lower()
+
+def definition_matches(index: dict, definition: str) -> bool:
+    """Whether a live index definition has the declared key columns, INCLUDE columns and predicate."""
+    m = _INDEXDEF.search(definition or "")
+    if m is None:
+        return False
+    return all(_normalize(index.get(part)) == _normalize(m.group(part)) for part in ("columns", "include", "where"))
+
+def check(conn) -> list:
+    """Returns the declared indexes that are missing, invalid or defined differently, with a status for each."""
+    existing = existing_indexes(conn)
+    problems = []
+    for index in INDEXES:
+        if index["name"] not in existing:
+            problems.append((index, "missing"))
+            continue
+        valid, definition = existing[index["name"]]
+        if not valid:
+            # A failed CONCURRENTLY build leaves an invalid index behind
+            problems.append((index, "invalid"))
+        elif not definition_matches(index, definition):
+            # Right name, wrong columns or predicate: IF NOT EXISTS would silently keep it
+            problems.append((index, "mismatch"))
+    return problems
+
+def apply(conn) -> list:
+    """Creates missing indexes, rebuilds invalid or mismatched ones and returns what is still broken afterwards."""
+    for index, status in check(conn):
+        if status in ("invalid", "mismatch"):
+            logging.info("Dropping %s index %s", status, index["name"])
+            conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS {index["name"]}'))
+        logging.info("Creating %s (used by %s)", index["name"], ", ".join(index["used_by"]))
+        conn.execute(text(create_statement(index)))
+    conn.execute(text(f"ANALYZE {POSITION_TABLE}"))
+    return check(conn)
+
+def report(problems: list):
+    if not problems:
+        print(f"All {len(INDEXES)} indexes on {POSITION_TABLE} are present, valid and match their declared definitions.")
+        return
+    for index, status in problems:
+        print(f"{status.upper():8} {index['name']:28} needed by {', '.join(index['used_by'])}")
+        print(f"         {create_statement(index)}")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.migrations", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", choices=["check", "apply"])
+    args = parser.parse_args(argv)
+
+    try:
+        # CONCURRENTLY cannot run inside a transaction block
+        with get_migration_engine().connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            problems = check(conn) if args.command == "check" else apply(conn)
+    except Exception as e:
+        logging.error("Migration %s failed: %s", args.command, str(e))
+        return 2
+    report(problems)
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
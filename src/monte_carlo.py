@@ -0,0 +1,213 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from src.stress import _sort_segments, _search_segments
+
+# Monte Carlo liquidation/bad-debt distribution over a position snapshot.
+#
+# Asset prices move jointly lognormal over the horizon, with volatilities and a
+# correlation matrix estimated from the oracle price histories of the market's reserves.
+# Assets without a usable history get a default volatility and are drawn independently
+# of everything else; `uncovered_symbols` lists them so callers can say so.
+#
+# Positions never appear in the per-scenario math individually: they are grouped by
+# (supply_symbol, borrow_symbol) pair, and within a pair every scenario moves all
+# positions by the same price ratio q = M_supply / M_borrow. A position is
+#   - liquidatable when HF0 * q <= 1, i.e. HF0 <= 1 / q,
+#   - under water (bad debt) when supply * M_supply < borrow * M_borrow, i.e. supply / borrow < 1 / q,
+# so sorting each pair once by HF0 (and by supply / borrow) with prefix sums turns
+# every pair into one searchsorted within its own run, broadcast over a chunk of scenarios.
+
+DEFAULT_DAILY_VOLATILITY = 0.05
+STABLE_DAILY_VOLATILITY = 0.002
+STABLECOINS = {"USDC", "USDT", "PYUSD", "USDS", "USDG", "FDUSD", "AUSD", "USD1", "USDe", "sUSDe", "syrupUSDC"}
+MIN_HISTORY_DAYS = 20  # fewer daily returns than this and a history is not trusted
+MEMORY_BUDGET_MB = int(os.getenv("MONTE_CARLO_MEMORY_MB", "256"))
+PROCESS_WORKERS = int(os.getenv("MONTE_CARLO_WORKERS", "0"))  # > 1 spreads scenario chunks over a process pool
+_BYTES_PER_CELL = 8 * 8  # float64 (scenario, pair) arrays alive at once while evaluating a chunk
+
+def oracle_price_series(frames: dict) -> dict:
+    """{symbol: assetOraclePriceUSD series indexed by timestamp} from {symbol: parsed reserve history}."""
+    prices = {}
+    for symbol, df in frames.items():
+        if df is None or df.empty:
+            continue
+        prices[symbol] = df.set_index("timestamp")["assetOraclePriceUSD"]
+    return prices
+
+def daily_log_returns(prices: dict) -> pd.DataFrame:
+    """Daily close-to-close log returns per symbol from {symbol: Series of prices indexed by timestamp}."""
+    closes = {}
+    for symbol, series in prices.items():
+        s = pd.Series(series).dropna()
+        s = s[s > 0]
+        if s.empty:
+            continue
+        closes[symbol] = s.resample("1D").last()
+    if not closes:
+        return pd.DataFrame()
+    return np.log(pd.DataFrame(closes)).diff().iloc[1:]
+
+def estimate_price_model(symbols: list, prices: dict, default_volatility: float = DEFAULT_DAILY_VOLATILITY) -> pd.DataFrame:
+    """
+    Daily volatility per symbol plus the correlation matrix of the symbols with enough
+    history. Returns a frame indexed by symbol with `volatility`, `source`
+    ("history" or "default") and one correlation column per symbol.
+    """
+    returns = daily_log_returns({s: p for s, p in prices.items() if s in symbols})
+    usable = [s for s in returns.columns if returns[s].count() >= MIN_HISTORY_DAYS and returns[s].std() > 0]
+
+    vol = {}
+    for s in symbols:
+        if s in usable:
+            vol[s] = float(returns[s].std())
+        else:
+            vol[s] = STABLE_DAILY_VOLATILITY if s in STABLECOINS else default_volatility
+
+    corr = np.eye(len(symbols))
+    if len(usable) > 1:
+        # Pairwise-complete correlations; histories of different reserves need not overlap fully
+        pos = [symbols.index(s) for s in usable]
+        corr[np.ix_(pos, pos)] = returns[usable].corr(min_periods=MIN_HISTORY_DAYS).fillna(0.0).to_numpy()
+        np.fill_diagonal(corr, 1.0)
+    corr = pd.DataFrame(corr, index=symbols, columns=symbols)
+
+    model = pd.DataFrame({
+        "volatility": pd.Series(vol),
+        "source": pd.Series({s: "history" if s in usable else "default" for s in symbols}),
+    }).loc[symbols]
+    return pd.concat([model, corr], axis=1)
+
+def uncovered_symbols(model: pd.DataFrame) -> list:
+    """Symbols without a usable price history: drawn at a default volatility, uncorrelated with the rest."""
+    return list(model.index[model["source"] != "history"])
+
+def _cholesky(corr: np.ndarray) -> np.ndarray:
+    """Cholesky factor of a correlation matrix, clipping eigenvalues if pairwise estimates made it indefinite."""
+    try:
+        return np.linalg.cholesky(corr)
+    except np.linalg.LinAlgError:
+        w, v = np.linalg.eigh(corr)
+        fixed = (v * np.maximum(w, 1e-8)) @ v.T
+        d = np.sqrt(np.diag(fixed))
+        return np.linalg.cholesky(fixed / np.outer(d, d))
+
+def _pair_curves(positions: pd.DataFrame, symbols: list) -> dict:
+    """Per (supply, borrow) pair: positions sorted by HF0 and by coverage, as flat arrays with each pair's run offsets."""
+    supply = positions["supply_value"].to_numpy(dtype="float64")
+    borrow = positions["borrow_value"].to_numpy(dtype="float64")
+    lt = positions["supply_lt"].to_numpy(dtype="float64")
+    bf = positions["borrow_factor"].to_numpy(dtype="float64")
+    s_code = pd.Categorical(positions["supply_symbol"], categories=symbols).codes
+    b_code = pd.Categorical(positions["borrow_symbol"], categories=symbols).codes
+    valid = (supply > 0) & (borrow > 0) & (bf > 0) & (s_code >= 0) & (b_code >= 0)
+    supply, borrow, lt, bf, s_code, b_code = supply[valid], borrow[valid], lt[valid], bf[valid], s_code[valid], b_code[valid]
+
+    pair_id, pairs = pd.factorize(pd.Series(s_code.astype("int64") * len(symbols) + b_code))
+    pairs = np.asarray(pairs, dtype="int64")
+    hf = (supply * lt) / (borrow * bf)
+    coverage = supply / borrow
+
+    def sorted_by(metric):
+        # Same (code, value) segments as the stress engine: one sorted array holds every pair's curve
+        order, keys, bounds = _sort_segments(pair_id, metric, len(pairs))
+        return keys, bounds, np.r_[0.0, np.cumsum(supply[order])], np.r_[0.0, np.cumsum(borrow[order])]
+
+    hf_keys, hf_bounds, _, hf_borrow = sorted_by(hf)
+    cov_keys, cov_bounds, cov_supply, cov_borrow = sorted_by(coverage)
+    return {
+        "supply_code": pairs // len(symbols),
+        "borrow_code": pairs % len(symbols),
+        "hf_keys": hf_keys,
+        "hf_bounds": hf_bounds,
+        "hf_borrow": hf_borrow,
+        "cov_keys": cov_keys,
+        "cov_bounds": cov_bounds,
+        "cov_supply": cov_supply,
+        "cov_borrow": cov_borrow,
+    }
+
+def _segment_sums(keys: np.ndarray, bounds: np.ndarray, prefix: np.ndarray, upper: np.ndarray, side: str) -> np.ndarray:
+    """Per scenario and pair, sum of the pair's values whose metric is below `upper` (prefix-sum difference)."""
+    hi = _search_segments(keys, bounds, upper.T, side).T
+    return prefix[hi] - prefix[bounds[:-1]][None, :]
+
+def _simulate_chunk(curves: dict, chol: np.ndarray, drift: np.ndarray, sigma: np.ndarray, n: int, seed) -> tuple:
+    """Liquidatable debt and bad debt for `n` scenarios, valued at post-shock prices."""
+    rng = np.random.default_rng(seed)
+    z = rng.standard_normal((n, chol.shape[0])) @ chol.T
+    m = np.exp(drift + z * sigma)  # price multipliers, (scenarios, symbols)
+    m_supply = m[:, curves["supply_code"]]
+    m_borrow = m[:, curves["borrow_code"]]
+    inv_q = m_borrow / m_supply  # HF0 <= 1/q liquidates; coverage < 1/q is under water
+
+    liquidatable = _segment_sums(curves["hf_keys"], curves["hf_bounds"], curves["hf_borrow"], inv_q, "right") * m_borrow
+    under_supply = _segment_sums(curves["cov_keys"], curves["cov_bounds"], curves["cov_supply"], inv_q, "left") * m_supply
+    under_borrow = _segment_sums(curves["cov_keys"], curves["cov_bounds"], curves["cov_borrow"], inv_q, "left") * m_borrow
+    return liquidatable.sum(axis=1), (under_borrow - under_supply).sum(axis=1)
+
+_worker_state = {}
+
+def _init_worker(curves, chol, drift, sigma):
+    # Position curves are shipped once per worker process, not once per chunk
+    _worker_state.update(curves=curves, chol=chol, drift=drift, sigma=sigma)
+
+def _run_worker_chunk(n: int, seed) -> tuple:
+    s = _worker_state
+    return _simulate_chunk(s["curves"], s["chol"], s["drift"], s["sigma"], n, seed)
+
+def simulate_losses(
+    positions: pd.DataFrame,
+    model: pd.DataFrame,
+    scenarios: int = 10_000,
+    horizon_days: float = 1.0,
+    seed: int = 0,
+    memory_budget_mb: int = MEMORY_BUDGET_MB,
+    workers: int = PROCESS_WORKERS,
+) -> pd.DataFrame:
+    """
+    Draws `scenarios` correlated price moves over `horizon_days` and returns one row
+    per scenario with `liquidatable_debt` and `bad_debt` (debt in excess of collateral,
+    at post-shock prices). Scenarios are evaluated in chunks sized to stay within
+    `memory_budget_mb`; with `workers` > 1 the chunks run in a process pool.
+    """
+    symbols = list(model.index)
+    curves = _pair_curves(positions, symbols)
+    n_pairs = len(curves["supply_code"])
+    if n_pairs == 0 or scenarios <= 0:
+        return pd.DataFrame({"liquidatable_debt": np.zeros(0), "bad_debt": np.zeros(0)})
+
+    sigma = model["volatility"].to_numpy(dtype="float64") * np.sqrt(horizon_days)
+    chol = _cholesky(model[symbols].to_numpy(dtype="float64"))
+    drift = -0.5 * sigma ** 2  # martingale prices: E[multiplier] = 1
+
+    chunk = max(1, min(scenarios, memory_budget_mb * 1024 * 1024 // (_BYTES_PER_CELL * max(n_pairs, len(symbols)))))
+    sizes = [min(chunk, scenarios - start) for start in range(0, scenarios, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if workers and workers > 1 and len(sizes) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(curves, chol, drift, sigma)) as pool:
+                results = list(pool.map(_run_worker_chunk, sizes, seeds))
+        except Exception as e:
+            logging.error("Process pool simulation failed, running in-process: %s", str(e))
+            results = [_simulate_chunk(curves, chol, drift, sigma, n, s) for n, s in zip(sizes, seeds)]
+    else:
+        results = [_simulate_chunk(curves, chol, drift, sigma, n, s) for n, s in zip(sizes, seeds)]
+
+    return pd.DataFrame({
+        "liquidatable_debt": np.concatenate([r[0] for r in results]),
+        "bad_debt": np.concatenate([r[1] for r in results]),
+    })
+
+def var_es(losses: np.ndarray, quantiles: list) -> pd.DataFrame:
+    """Value at Risk and Expected Shortfall (mean loss at or beyond VaR) per quantile."""
+    losses = np.sort(np.asarray(losses, dtype="float64"))
+    rows = []
+    for q in quantiles:
+        var = float(np.quantile(losses, q)) if len(losses) else 0.0
+        tail = losses[losses >= var]
+        rows.append({"quantile": q, "var": var, "es": float(tail.mean()) if len(tail) else var})
+    return pd.DataFrame(rows)
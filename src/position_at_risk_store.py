@@ -0,0 +1,81 @@
+import os
+import re
+import logging
+import threading
+import pandas as pd
+from typing import Optional
+from src.database import get_position_at_risk_data
+
+# Aggregated Position-at-Risk rows are persisted per (market, asset, threshold) so that
+# each refresh only aggregates the timestamps indexed since the last one.
+STORE_DIR = os.getenv("POSITION_AT_RISK_STORE_DIR", os.path.join(".cache", "position_at_risk"))
+
+_frames = {}
+_locks = {}
+_locks_guard = threading.Lock()
+
+def _key(market_name: str, asset_symbol: str, threshold: float) -> str:
+    raw = f"{market_name}_{asset_symbol}_{threshold:g}"
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", raw)
+
+def _lock_for(key: str) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+def _store_path(key: str) -> str:
+    return os.path.join(STORE_DIR, f"{key}.parquet")
+
+def _read_store(key: str) -> pd.DataFrame:
+    if key in _frames:
+        return _frames[key]
+    path = _store_path(key)
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        logging.error("Error reading position at risk store %s: %s", path, str(e))
+        return pd.DataFrame()
+
+def _write_store(key: str, df: pd.DataFrame):
+    path = _store_path(key)
+    try:
+        os.makedirs(STORE_DIR, exist_ok=True)
+        tmp_path = path + ".tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logging.error("Error writing position at risk store %s: %s", path, str(e))
+
+def get_watermark(market_name: str, asset_symbol: str, threshold: float = 1.1) -> Optional[int]:
+    """Latest timestamp already aggregated for the given series, or None."""
+    df = _read_store(_key(market_name, asset_symbol, threshold))
+    if df.empty:
+        return None
+    return int(df["timestamp"].max())
+
+def get_position_at_risk_history(market_name: str, asset_symbol: str, threshold: float = 1.1) -> pd.DataFrame:
+    """
+    Returns the full Position-at-Risk time series, aggregating only timestamps at or
+    after the stored watermark. The watermark timestamp itself is recomputed in case it
+    was still being indexed on the previous refresh.
+    """
+    key = _key(market_name, asset_symbol, threshold)
+    with _lock_for(key):
+        stored = _read_store(key)
+        watermark = None if stored.empty else int(stored["timestamp"].max())
+
+        new_rows = get_position_at_risk_data(market_name, asset_symbol, threshold, since=watermark)
+        if new_rows.empty:
+            _frames[key] = stored
+            return stored.copy()
+
+        if stored.empty:
+            combined = new_rows
+        else:
+            combined = pd.concat([stored[stored["timestamp"] < watermark], new_rows], ignore_index=True)
+        combined = combined.sort_values("timestamp").reset_index(drop=True)
+
+        _write_store(key, combined)
+        _frames[key] = combined
+        return combined.copy()
@@ -0,0 +1,139 @@
+import os
+import sys
+import time
+import logging
+import threading
+import contextvars
+import numpy as np
+import pandas as pd
+from collections import deque
+
+# In-memory query instrumentation: a rolling window of (latency, rows, bytes) samples
+# per query, named after the src.database function that issued it, plus a slow-query
+# log with an optional EXPLAIN (ANALYZE, BUFFERS) capture.
+
+STATS_WINDOW = int(os.getenv("QUERY_STATS_WINDOW", "500"))  # samples kept per query
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "1000"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "0") == "1"  # EXPLAIN ANALYZE re-runs the query
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", os.path.join(".cache", "slow_queries.log"))
+SLOW_QUERY_KEEP = 100
+
+_samples = {}
+_callers = {}
+_slow = deque(maxlen=SLOW_QUERY_KEEP)
+_stats_lock = threading.Lock()
+_explain_lock = threading.Lock()
+_slow_logger = None
+
+# Frames of these modules/functions are plumbing, not the query's owner
+_INTERNAL_MODULES = {__name__, "src.singleflight"}
+_INTERNAL_FUNCTIONS = {"run_query", "_execute_query", "run_concurrently", "iter_query"}
+
+# Page that handed work to a pool thread, whose own stack has no page frames
+_calling_page = contextvars.ContextVar("query_calling_page", default=None)
+
+def caller_info() -> tuple:
+    """(query name, caller page) for the current call stack, or the page that submitted it to this thread."""
+    name, page = None, None
+    frame = sys._getframe(1)
+    while frame is not None and (name is None or page is None):
+        module = frame.f_globals.get("__name__", "")
+        func = frame.f_code.co_name
+        if name is None and module not in _INTERNAL_MODULES and func not in _INTERNAL_FUNCTIONS:
+            name = func if module == "src.database" else f"{module}.{func}"
+        if page is None and module.startswith("pages."):
+            page = module
+        frame = frame.f_back
+    return name or "unknown", page or _calling_page.get() or "-"
+
+def caller_context(page: str = None) -> contextvars.Context:
+    """
+    Copy of the current context carrying the calling page (found on the current stack
+    unless given), for running a call on another thread: `executor.submit(ctx.run, f)`.
+    A context can only be entered by one thread at a time, so take one per call.
+    """
+    ctx = contextvars.copy_context()
+    page = page or caller_info()[1]
+    if page != "-":
+        ctx.run(_calling_page.set, page)
+    return ctx
+
+def _get_slow_logger() -> logging.Logger:
+    global _slow_logger
+    if _slow_logger is None:
+        logger = logging.getLogger("slow_query")
+        try:
+            os.makedirs(os.path.dirname(SLOW_QUERY_LOG) or ".", exist_ok=True)
+            handler = logging.FileHandler(SLOW_QUERY_LOG)
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger.addHandler(handler)
+        except Exception as e:
+            logging.error("Error opening slow query log %s: %s", SLOW_QUERY_LOG, str(e))
+        _slow_logger = logger
+    return _slow_logger
+
+def _capture_plan(entry: dict, explain):
+    # One EXPLAIN ANALYZE at a time; others are skipped rather than piling onto the DB
+    if not _explain_lock.acquire(blocking=False):
+        return
+    try:
+        entry["plan"] = explain()
+        _get_slow_logger().warning("Plan for %s:\n%s", entry["query"], entry["plan"])
+    except Exception as e:
+        logging.error("EXPLAIN failed for %s: %s", entry["query"], str(e))
+    finally:
+        _explain_lock.release()
+
+def record(name: str, page: str, seconds: float, rows: int, nbytes: int, explain=None):
+    """
+    Adds one sample. Queries slower than SLOW_QUERY_MS go to the slow-query log and,
+    with SLOW_QUERY_EXPLAIN=1, get their plan captured in the background via `explain()`.
+    """
+    with _stats_lock:
+        samples = _samples.get(name)
+        if samples is None:
+            samples = _samples[name] = deque(maxlen=STATS_WINDOW)
+        samples.append((seconds, rows, nbytes))
+        _callers.setdefault(name, set()).add(page)
+
+    ms = seconds * 1000
+    if ms < SLOW_QUERY_MS:
+        return
+    entry = {"at": time.time(), "query": name, "page": page, "ms": ms, "rows": rows, "bytes": nbytes, "plan": None}
+    _slow.append(entry)
+    _get_slow_logger().warning("Slow query %s from %s: %.0f ms, %d rows, %d bytes", name, page, ms, rows, nbytes)
+    if SLOW_QUERY_EXPLAIN and explain is not None:
+        threading.Thread(target=_capture_plan, args=(entry, explain), name="explain", daemon=True).start()
+
+def frame_bytes(df) -> int:
+    """Approximate in-memory size of a result (shallow, so object columns count pointers only)."""
+    if isinstance(df, pd.DataFrame):
+        return int(df.memory_usage(index=False).sum())
+    return 0
+
+def summary() -> pd.DataFrame:
+    """Latency percentiles, rows and bytes per query over the rolling window."""
+    with _stats_lock:
+        snapshot = {name: list(samples) for name, samples in _samples.items()}
+        callers = {name: sorted(pages) for name, pages in _callers.items()}
+    rows = []
+    for name, samples in snapshot.items():
+        arr = np.array(samples, dtype="float64")
+        ms = arr[:, 0] * 1000
+        rows.append({
+            "query": name,
+            "calls": len(samples),
+            "p50_ms": np.percentile(ms, 50),
+            "p95_ms": np.percentile(ms, 95),
+            "max_ms": ms.max(),
+            "avg_rows": arr[:, 1].mean(),
+            "avg_kb": arr[:, 2].mean() / 1024,
+            "callers": ", ".join(callers.get(name, [])),
+        })
+    if not rows:
+        return pd.DataFrame(columns=["query", "calls", "p50_ms", "p95_ms", "max_ms", "avg_rows", "avg_kb", "callers"])
+    return pd.DataFrame(rows).sort_values("p95_ms", ascending=False).reset_index(drop=True)
+
+def slow_queries() -> list:
+    """Most recent slow queries, newest first."""
+    return list(reversed(_slow))
@@ -0,0 +1,288 @@
+import os
+import json
+import bisect
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from src.api import fetch_reserve_metrics_history, fetch_reserve_metrics_histories
+from src.time_window import isoformat_z
+
+# Local time-series store for reserve metrics history, keyed by (lending_market, reserve).
+# Each sync only asks the API for points after the newest stored timestamp, so payload
+# size depends on how much new data there is rather than on the window length. Parsed
+# timestamps are kept next to the entries, so merge/window cost follows the new data too.
+STORE_DIR = os.getenv("RESERVE_HISTORY_STORE_DIR", os.path.join(".cache", "reserve_history"))
+RETENTION_DAYS = int(os.getenv("RESERVE_HISTORY_RETENTION_DAYS", "365"))
+
+_stores = {}
+_locks = {}
+_locks_guard = threading.Lock()
+
+def _parse_ts(value) -> Optional[datetime]:
+    if not isinstance(value, str):
+        return None
+    try:
+        t = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return t if t.tzinfo else t.replace(tzinfo=timezone.utc)
+
+def _epoch(value) -> Optional[float]:
+    t = _parse_ts(value)
+    return t.timestamp() if t is not None else None
+
+def _lock_for(key: tuple) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+def _store_path(market: str, reserve: str) -> str:
+    return os.path.join(STORE_DIR, f"{market}_{reserve}.json")
+
+def _empty_store() -> dict:
+    return {"covered_from": None, "synced_to": None, "history": [], "epochs": []}
+
+def _load_store(market: str, reserve: str) -> dict:
+    """
+    Returns {"covered_from", "synced_to", "history", "epochs"}: `history` is sorted by
+    timestamp and `epochs` holds its parsed timestamps (epoch seconds) in the same
+    order, so syncs never re-parse stored entries. `covered_from`/`synced_to` bound the
+    window already fetched, whether or not it returned any points.
+    """
+    key = (market, reserve)
+    if key in _stores:
+        return _stores[key]
+    store = _empty_store()
+    path = _store_path(market, reserve)
+    if os.path.exists(path):
+        try:
+            with open(path) as f:
+                raw = json.load(f)
+            history = raw.get("history", [])
+            epochs = raw.get("epochs")
+            if not isinstance(epochs, list) or len(epochs) != len(history):
+                # Stores written before epochs were persisted: parse once
+                pairs = sorted(
+                    ((e, h) for h in history if (e := _epoch(h.get("timestamp") if isinstance(h, dict) else None)) is not None),
+                    key=lambda p: p[0],
+                )
+                epochs, history = [e for e, _ in pairs], [h for _, h in pairs]
+            store = {
+                "covered_from": _parse_ts(raw.get("covered_from")),
+                "synced_to": _parse_ts(raw.get("synced_to")),
+                "history": history,
+                "epochs": epochs,
+            }
+        except Exception as e:
+            logging.error("Error reading reserve history store %s: %s", path, str(e))
+    _stores[key] = store
+    return store
+
+def _save_store(market: str, reserve: str, store: dict):
+    path = _store_path(market, reserve)
+    try:
+        os.makedirs(STORE_DIR, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "covered_from": isoformat_z(store["covered_from"]) if store["covered_from"] else None,
+                "synced_to": isoformat_z(store["synced_to"]) if store["synced_to"] else None,
+                "history": store["history"],
+                "epochs": store["epochs"],
+            }, f)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logging.error("Error writing reserve history store %s: %s", path, str(e))
+
+def _merge(history: list, epochs: list, new: list) -> tuple:
+    """
+    Merges new entries into a sorted history, de-duplicating on timestamp (new entries
+    win). Only the new entries are parsed, and only the stored tail they overlap is
+    rebuilt, so a delta sync costs O(new points) rather than O(stored history).
+    Returns (history, epochs).
+    """
+    parsed = {}
+    for h in new:
+        e = _epoch(h.get("timestamp")) if isinstance(h, dict) else None
+        if e is not None:
+            parsed[e] = h
+    if not parsed:
+        return history, epochs
+    i = bisect.bisect_left(epochs, min(parsed))
+    tail = dict(zip(epochs[i:], history[i:]))
+    tail.update(parsed)
+    tail_epochs = sorted(tail)
+    return history[:i] + [tail[e] for e in tail_epochs], epochs[:i] + tail_epochs
+
+def _plan(store: dict, start: datetime, end: datetime) -> list:
+    """
+    Ranges that must be fetched to cover [start, end]: a full fetch for a store that
+    was never synced, otherwise an optional backfill before `covered_from` and a delta
+    after the newest point (or after the last synced window if it had no points).
+    """
+    covered_from = store["covered_from"]
+    if covered_from is None:
+        return [("full", start, end)]
+    ranges = []
+    if start < covered_from:
+        ranges.append(("backfill", start, covered_from))
+    if store["epochs"]:
+        since = datetime.fromtimestamp(store["epochs"][-1], timezone.utc)
+    else:
+        since = store["synced_to"] or covered_from
+    if since < end:
+        ranges.append(("delta", since, end))
+    return ranges
+
+def _apply(market: str, reserve: str, store: dict, start: datetime, ranges: list, payloads: list) -> dict:
+    """Merges fetched payloads into the store, trims it to retention and persists it."""
+    history, epochs = store["history"], store["epochs"]
+    covered_from, synced_to = store["covered_from"], store["synced_to"]
+    changed = False
+    for (kind, _, range_end), data in zip(ranges, payloads):
+        if not isinstance(data, dict):
+            continue
+        history, epochs = _merge(history, epochs, data.get("history", []))
+        # The attempted window counts as covered even when it returned no points
+        if kind in ("full", "backfill"):
+            covered_from = start
+        if kind in ("full", "delta"):
+            synced_to = max(synced_to, range_end) if synced_to else range_end
+        changed = True
+    if not changed:
+        return store
+
+    cutoff = datetime.now(timezone.utc) - timedelta(days=RETENTION_DAYS)
+    i = bisect.bisect_left(epochs, cutoff.timestamp())
+    history, epochs = history[i:], epochs[i:]
+    if covered_from is not None:
+        covered_from = max(covered_from, cutoff)
+    store = {"covered_from": covered_from, "synced_to": synced_to, "history": history, "epochs": epochs}
+    _stores[(market, reserve)] = store
+    _save_store(market, reserve, store)
+    return store
+
+def _window(store: dict, start: datetime, end: datetime) -> list:
+    epochs = store["epochs"]
+    lo = bisect.bisect_left(epochs, start.timestamp())
+    hi = bisect.bisect_right(epochs, end.timestamp())
+    return store["history"][lo:hi]
+
+def sync_reserve_history(market: str, reserve: str, start: datetime, end: datetime) -> list:
+    """
+    Brings the local store up to `end` and back to `start`, fetching only what is
+    missing: a backfill if `start` is older than anything stored, and a delta from
+    the newest stored timestamp onwards. Returns the stored history in [start, end].
+    """
+    with _lock_for((market, reserve)):
+        store = _load_store(market, reserve)
+        ranges = _plan(store, start, end)
+        payloads = [
+            fetch_reserve_metrics_history(market, reserve, isoformat_z(s), isoformat_z(e))
+            for _, s, e in ranges
+        ]
+        store = _apply(market, reserve, store, start, ranges, payloads)
+        return _window(store, start, end)
+
+def sync_reserve_histories(keys: list, start: datetime, end: datetime) -> dict:
+    """
+    Batch version of `sync_reserve_history` for a list of (market, reserve) keys. All
+    missing ranges are fetched concurrently (bounded), then merged per key.
+    """
+    keys = sorted(set(keys))
+    locks = [_lock_for(key) for key in keys]
+    for lock in locks:
+        lock.acquire()
+    try:
+        plans = {key: _plan(_load_store(*key), start, end) for key in keys}
+        items = [(key, r) for key in keys for r in plans[key]]
+        payloads = fetch_reserve_metrics_histories([
+            (key[0], key[1], isoformat_z(s), isoformat_z(e)) for key, (_, s, e) in items
+        ])
+        result = {}
+        for key in keys:
+            key_payloads = [p for (k, _), p in zip(items, payloads) if k == key]
+            store = _apply(key[0], key[1], _load_store(*key), start, plans[key], key_payloads)
+            result[key] = _window(store, start, end)
+        return result
+    finally:
+        for lock in reversed(locks):
+            lock.release()
+
+def get_reserve_history(market: str, reserve: str, start: str, end: str) -> dict:
+    """
+    Same payload shape as the metrics history endpoint ({"history": [...]}), served
+    from the local store after a delta sync.
+    """
+    start_t, end_t = _parse_ts(start), _parse_ts(end)
+    if start_t is None or end_t is None:
+        return {"history": []}
+    return {"history": sync_reserve_history(market, reserve, start_t, end_t)}
+
+def get_reserve_histories(keys: list, start: str, end: str) -> dict:
+    """Batch version of `get_reserve_history`; returns {(market, reserve): {"history": [...]}}."""
+    start_t, end_t = _parse_ts(start), _parse_ts(end)
+    if start_t is None or end_t is None:
+        return {key: {"history": []} for key in keys}
+    synced = sync_reserve_histories(keys, start_t, end_t)
+    return {key: {"history": synced.get(key, [])} for key in keys}
+
+# --- Columnar parser ---
+# Fixed schema for the `metrics` object of each history entry. Every numeric field is
+# parsed to float64 in one block; the rest stay as Python objects.
+NUMERIC_METRIC_FIELDS = [
+    "decimals",
+    "borrowTvl",
+    "depositTvl",
+    "totalSupply",
+    "borrowFactor",
+    "totalBorrows",
+    "totalLiquidity",
+    "protocolTakeRate",
+    "borrowInterestAPY",
+    "supplyInterestAPY",
+    "reserveBorrowLimit",
+    "assetOraclePriceUSD",
+    "reserveDepositLimit",
+]
+OBJECT_METRIC_FIELDS = ["symbol", "borrowCurve"]
+HISTORY_COLUMNS = ["timestamp"] + OBJECT_METRIC_FIELDS + NUMERIC_METRIC_FIELDS
+DEFAULT_DECIMALS = 6
+
+def parse_reserve_history(history: list) -> pd.DataFrame:
+    """
+    Turns a metrics history payload into a typed, timestamp-sorted frame with
+    HISTORY_COLUMNS. Deposit/borrow limits are scaled from raw token units using each
+    row's `decimals` (forward/back-filled, DEFAULT_DECIMALS if never reported).
+    """
+    if not history:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+
+    fields = OBJECT_METRIC_FIELDS + NUMERIC_METRIC_FIELDS
+    records = []
+    for h in history:
+        m = h.get("metrics") or {}
+        records.append((h.get("timestamp"),) + tuple(m.get(f) for f in fields))
+    columns = list(zip(*records))
+
+    n_obj = 1 + len(OBJECT_METRIC_FIELDS)
+    numeric = np.array(columns[n_obj:], dtype=object)
+    try:
+        values = numeric.astype("float64")
+    except (TypeError, ValueError):
+        # Some field holds a non-numeric string; fall back to per-column coercion
+        values = np.vstack([pd.to_numeric(row, errors="coerce") for row in numeric]).astype("float64")
+
+    df = pd.DataFrame(values.T, columns=NUMERIC_METRIC_FIELDS)
+    df.insert(0, "timestamp", pd.to_datetime(pd.Series(columns[0], dtype=object), errors="coerce", utc=True))
+    for i, f in enumerate(OBJECT_METRIC_FIELDS, start=1):
+        df.insert(i, f, pd.Series(columns[i], dtype=object))
+
+    decimals = df["decimals"].ffill().bfill().fillna(DEFAULT_DECIMALS)
+    scale = np.power(10.0, decimals.to_numpy())
+    df["reserveDepositLimit"] = df["reserveDepositLimit"] / scale
+    df["reserveBorrowLimit"] = df["reserveBorrowLimit"] / scale
+
+    return df.sort_values("timestamp", kind="stable").reset_index(drop=True)
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+# Liquidation shock curves: for each symbol, the positions' liquidation price shocks
+# (rounded to SHOCK_DECIMALS) are sorted once and turned into prefix sums of supply
+# and debt value. Any selection of symbols is then answered by merging the selected
+# curves on the union of their shock grids, without touching the positions again.
+SHOCK_DECIMALS = 4
+CURVE_COLUMNS = ["shock_rounded", "cumulative_supply_value", "cumulative_borrow_value"]
+
+class ShockCurves:
+    """Precomputed per-symbol liquidation curves for one side (collateral or debt) of a snapshot."""
+
+    def __init__(self, symbols: list, curves: dict, adjusted_column: str):
+        self.symbols = symbols
+        self.curves = curves  # symbol -> {"shocks", "supply", "borrow", "adjusted"} (prefix sums)
+        self.adjusted_column = adjusted_column
+
+    def curve(self, symbols: list, adjust: bool = False) -> pd.DataFrame:
+        """
+        Cumulative liquidatable collateral and debt vs shock for the union of `symbols`.
+        With `adjust`, the side's own value is taken at its post-shock level.
+        """
+        selected = [self.curves[s] for s in symbols if s in self.curves and len(self.curves[s]["shocks"])]
+        if not selected:
+            return pd.DataFrame(columns=CURVE_COLUMNS)
+
+        columns = {"supply": "supply", "borrow": "borrow"}
+        if adjust:
+            columns["supply" if self.adjusted_column == "supply_value" else "borrow"] = "adjusted"
+
+        if len(selected) == 1:
+            c = selected[0]
+            grid = c["shocks"]
+            supply, borrow = c[columns["supply"]], c[columns["borrow"]]
+        else:
+            # k-way merge: evaluate every curve's step function on the union grid
+            grid = np.unique(np.concatenate([c["shocks"] for c in selected]))
+            supply = np.zeros(len(grid))
+            borrow = np.zeros(len(grid))
+            for c in selected:
+                idx = np.searchsorted(c["shocks"], grid, side="right") - 1
+                hit = idx >= 0
+                idx = idx.clip(0)
+                supply += np.where(hit, c[columns["supply"]][idx], 0.0)
+                borrow += np.where(hit, c[columns["borrow"]][idx], 0.0)
+
+        return pd.DataFrame({
+            "shock_rounded": grid,
+            "cumulative_supply_value": supply,
+            "cumulative_borrow_value": borrow,
+        })
+
+def build_shock_curves(df: pd.DataFrame, symbol_col: str, shock_col: str, adjusted_column: str) -> ShockCurves:
+    """
+    Buckets positions by (symbol, rounded shock) in one sort and stores per-symbol prefix
+    sums of supply, borrow and the shock-adjusted value of `adjusted_column`
+    (supply * (1 - shock) for collateral shocks, borrow * (1 + shock) for debt shocks).
+    """
+    symbols = sorted(s for s in df[symbol_col].dropna().unique())
+    d = df[df[shock_col].notna() & df[symbol_col].notna()]
+    codes, uniques = pd.factorize(d[symbol_col])
+    shocks = np.round(d[shock_col].to_numpy(dtype="float64"), SHOCK_DECIMALS)
+    supply = d["supply_value"].to_numpy(dtype="float64")
+    borrow = d["borrow_value"].to_numpy(dtype="float64")
+
+    curves = {}
+    if len(d):
+        order = np.lexsort((shocks, codes))
+        codes, shocks, supply, borrow = codes[order], shocks[order], supply[order], borrow[order]
+        # Bucket boundaries: a new symbol or a new shock value
+        starts = np.flatnonzero(np.r_[True, (codes[1:] != codes[:-1]) | (shocks[1:] != shocks[:-1])])
+        b_codes, b_shocks = codes[starts], shocks[starts]
+        b_supply = np.add.reduceat(supply, starts)
+        b_borrow = np.add.reduceat(borrow, starts)
+        if adjusted_column == "supply_value":
+            b_adjusted = b_supply * (1 - b_shocks)
+        else:
+            b_adjusted = b_borrow * (1 + b_shocks)
+
+        bounds = np.flatnonzero(np.r_[True, b_codes[1:] != b_codes[:-1], True])
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            curves[uniques[b_codes[lo]]] = {
+                "shocks": b_shocks[lo:hi],
+                "supply": np.cumsum(b_supply[lo:hi]),
+                "borrow": np.cumsum(b_borrow[lo:hi]),
+                "adjusted": np.cumsum(b_adjusted[lo:hi]),
+            }
+    return ShockCurves(symbols, curves, adjusted_column)
+
+def build_liquidation_curves(df: pd.DataFrame) -> tuple:
+    """(collateral-shock curves by supply symbol, debt-shock curves by borrow symbol) of a liquidation risk frame."""
+    supply_curves = build_shock_curves(df, "supply_symbol", "collateral_liquidation_price_shock", "supply_value")
+    borrow_curves = build_shock_curves(df, "borrow_symbol", "borrow_liquidation_price_shock", "borrow_value")
+    return supply_curves, borrow_curves
@@ -0,0 +1,87 @@
+import logging
+import functools
+import threading
+import pandas as pd
+from concurrent.futures import Future
+
+# Request coalescing: when several sessions ask for the same query or URL at the same
+# time (e.g. right after a cache expiry), only the first caller runs it and the others
+# wait on its future. The leader always runs inline in its own thread and is never
+# queued on an executor, so a waiting follower can only be waiting on work that is
+# already running; a leader re-entering its own key runs the call directly.
+
+class SingleFlight:
+    """Group of in-flight calls keyed by an arbitrary hashable key."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> [Future, leader thread id, follower count]
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Runs `func(*args, **kwargs)` unless a call with `key` is already in flight, in
+        which case it waits for that call. Returns (result, shared), where `shared`
+        tells whether the result object was handed to more than one caller.
+        """
+        me = threading.get_ident()
+        with self._lock:
+            entry = self._calls.get(key)
+            if entry is None:
+                entry = self._calls[key] = [Future(), me, 0]
+                leader = True
+            elif entry[1] == me:
+                leader = None
+            else:
+                entry[2] += 1
+                leader = False
+
+        if leader is None:
+            return func(*args, **kwargs), False
+        if not leader:
+            return entry[0].result(), True
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            entry[0].set_exception(e)
+            raise
+        else:
+            entry[0].set_result(result)
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+                followers = entry[2]
+        return result, followers > 0
+
+def _freeze(value):
+    """Hashable form of call arguments (dicts and lists become sorted tuples)."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    hash(value)
+    return value
+
+def single_flight(copy_result: bool = True):
+    """
+    Decorator coalescing concurrent identical calls of `func`. When a DataFrame result
+    was shared, every caller gets its own copy (so callers can keep mutating what they
+    get back) unless `copy_result` is False; other results are shared as-is and must
+    be treated as read-only.
+    """
+    def decorator(func):
+        group = SingleFlight()
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                key = (_freeze(args), _freeze(kwargs))
+            except TypeError:
+                return func(*args, **kwargs)
+            result, shared = group.do(key, func, *args, **kwargs)
+            if shared:
+                logging.debug("Coalesced call to %s", func.__qualname__)
+                if copy_result and isinstance(result, pd.DataFrame):
+                    return result.copy()
+            return result
+        return wrapper
+    return decorator
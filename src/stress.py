@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+from typing import Optional
+
+# Joint price-shock stress tests over a liquidation risk frame. A position's current
+# health factor is HF0 = lltv / ltv = 1 + borrow_liquidation_price_shock. Under a
+# collateral price drop c and a debt price rise d it becomes
+#     HF = HF0 * (1 - c) / (1 + d)
+# and the position is liquidatable once HF <= 1, i.e. HF0 <= (1 + d) / (1 - c).
+# With positions sorted by HF0 and prefix sums of their values, every scenario is one
+# searchsorted lookup instead of a pass over the positions.
+
+GRID_POINTS = 200
+MAX_COLLATERAL_SHOCK = 0.99
+MAX_DEBT_SHOCK = 1.5
+
+def health_factors(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Positions with a defined HF0 (both collateral and debt present), with an `hf` column.
+    Taken from `borrow_liquidation_price_shock` in a liquidation risk frame, otherwise
+    computed from supply/borrow values, supply_lt and borrow_factor (market positions).
+    """
+    if "borrow_liquidation_price_shock" in df.columns:
+        d = df[df["borrow_liquidation_price_shock"].notna()]
+        return d.assign(hf=1 + d["borrow_liquidation_price_shock"].astype("float64"))
+    supply = df["supply_value"].to_numpy(dtype="float64")
+    borrow = df["borrow_value"].to_numpy(dtype="float64")
+    bf = df["borrow_factor"].to_numpy(dtype="float64")
+    defined = (supply != 0) & (borrow != 0) & (bf != 0)
+    d = df[defined]
+    return d.assign(hf=(supply * df["supply_lt"].to_numpy(dtype="float64"))[defined] / (borrow * bf)[defined])
+
+def _sorted_prefix(hf: np.ndarray, supply: np.ndarray, borrow: np.ndarray) -> tuple:
+    """HF sorted ascending plus prefix sums (with a leading 0) of supply and borrow in that order."""
+    order = np.argsort(hf, kind="stable")
+    return hf[order], np.r_[0.0, np.cumsum(supply[order])], np.r_[0.0, np.cumsum(borrow[order])]
+
+def stress_grid(
+    df: pd.DataFrame,
+    supply_symbols: Optional[list] = None,
+    borrow_symbols: Optional[list] = None,
+    points: int = GRID_POINTS,
+    max_collateral_shock: float = MAX_COLLATERAL_SHOCK,
+    max_debt_shock: float = MAX_DEBT_SHOCK,
+) -> dict:
+    """
+    Liquidatable collateral and debt on a `points` x `points` grid of simultaneous
+    collateral-down and debt-up shocks. The collateral shock hits positions whose
+    supply symbol is in `supply_symbols` and the debt shock those whose borrow symbol
+    is in `borrow_symbols` (None = every position).
+
+    Returns {"collateral_shocks", "debt_shocks", "collateral", "debt"} where the two
+    value grids have shape (len(debt_shocks), len(collateral_shocks)).
+    """
+    d = health_factors(df)
+    hf = d["hf"].to_numpy(dtype="float64")
+    supply = d["supply_value"].to_numpy(dtype="float64")
+    borrow = d["borrow_value"].to_numpy(dtype="float64")
+    in_supply = np.ones(len(d), dtype=bool) if supply_symbols is None else d["supply_symbol"].isin(supply_symbols).to_numpy()
+    in_borrow = np.ones(len(d), dtype=bool) if borrow_symbols is None else d["borrow_symbol"].isin(borrow_symbols).to_numpy()
+
+    c = np.linspace(0.0, max_collateral_shock, points)
+    s = np.linspace(0.0, max_debt_shock, points)
+    C, S = np.meshgrid(c, s)
+    collateral_factor = 1 / (1 - C)
+    debt_factor = 1 + S
+
+    collateral = np.zeros(C.shape)
+    debt = np.zeros(C.shape)
+    # Each position class only feels the shocks that apply to it
+    for mask, threshold in [
+        (in_supply & in_borrow, debt_factor * collateral_factor),
+        (in_supply & ~in_borrow, collateral_factor),
+        (~in_supply & in_borrow, debt_factor),
+        (~in_supply & ~in_borrow, np.ones(C.shape)),
+    ]:
+        if not mask.any():
+            continue
+        h, cum_supply, cum_borrow = _sorted_prefix(hf[mask], supply[mask], borrow[mask])
+        k = np.searchsorted(h, threshold, side="right")
+        collateral += cum_supply[k]
+        debt += cum_borrow[k]
+
+    return {"collateral_shocks": c, "debt_shocks": s, "collateral": collateral, "debt": debt}
+
+# Price moves for the per-asset sensitivity matrix (-50% .. +50%)
+SENSITIVITY_SHOCKS = tuple(np.round(np.arange(-0.5, 0.5001, 0.05), 2))
+
+def _sort_segments(codes: np.ndarray, values: np.ndarray, n_codes: int) -> tuple:
+    """
+    Sorts positions by (code, value). Returns the order, the sorted values and the
+    integer offsets of each code's run (length n_codes + 1), so lookups never depend
+    on a float key separating one code's values from the next.
+    """
+    order = np.lexsort((values, codes))
+    bounds = np.searchsorted(codes[order], np.arange(n_codes + 1), side="left")
+    return order, values[order], bounds
+
+def _search_segments(values: np.ndarray, bounds: np.ndarray, targets: np.ndarray, side: str) -> np.ndarray:
+    """Index into the sorted `values` of each of `targets[k]`, searched only within code k's run."""
+    out = np.empty(targets.shape, dtype="int64")
+    for k in range(len(bounds) - 1):
+        lo, hi = bounds[k], bounds[k + 1]
+        out[k] = lo + np.searchsorted(values[lo:hi], targets[k], side=side)
+    return out
+
+def sensitivity_matrix(df: pd.DataFrame, shocks: tuple = SENSITIVITY_SHOCKS) -> pd.DataFrame:
+    """
+    Newly liquidatable debt when a single asset's price moves by each of `shocks`
+    while every other price stays put, for every asset in `df` (positions with
+    supply/borrow values, supply_lt and borrow_factor).
+
+    A price move s of asset A multiplies the HF of positions with A as collateral by
+    (1 + s) and divides the HF of positions with A as debt by (1 + s); positions with
+    A on both sides are unaffected. Positions are sorted once per side by
+    (symbol, HF), so each asset's row of the matrix is one searchsorted in its segment.
+
+    Returns a frame indexed by symbol with one column per shock.
+    """
+    shocks = np.asarray(shocks, dtype="float64")
+    supply = df["supply_value"].to_numpy(dtype="float64")
+    borrow = df["borrow_value"].to_numpy(dtype="float64")
+    lt = df["supply_lt"].to_numpy(dtype="float64")
+    bf = df["borrow_factor"].to_numpy(dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hf = (supply * lt) / (borrow * bf)
+    # Positions that are already liquidatable are not "newly" liquidatable
+    healthy = (supply > 0) & (borrow > 0) & (bf > 0) & np.isfinite(hf) & (hf > 1)
+
+    symbols = sorted(set(df["supply_symbol"].dropna().unique()) | set(df["borrow_symbol"].dropna().unique()))
+    supply_codes = pd.Categorical(df["supply_symbol"], categories=symbols).codes
+    borrow_codes = pd.Categorical(df["borrow_symbol"], categories=symbols).codes
+    cross = supply_codes != borrow_codes
+
+    result = np.zeros((len(symbols), len(shocks)))
+    factor = 1 + shocks
+    # Collateral side liquidates once HF0 <= 1 / (1 + s), debt side once HF0 <= 1 + s
+    for codes, threshold in [(supply_codes, 1 / factor), (borrow_codes, factor)]:
+        mask = healthy & cross & (codes >= 0)
+        order, keys, bounds = _sort_segments(codes[mask], hf[mask], len(symbols))
+        cum_debt = np.r_[0.0, np.cumsum(borrow[mask][order])]
+        upper = np.broadcast_to(np.maximum(threshold, 1.0), result.shape)
+        hi = _search_segments(keys, bounds, upper, "right")
+        # Every remaining position has HF0 > 1, so each segment's start is its lower bound
+        result += cum_debt[hi] - cum_debt[bounds[:-1, None]]
+
+    return pd.DataFrame(result, index=pd.Index(symbols, name="symbol"), columns=shocks)
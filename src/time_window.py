@@ -0,0 +1,30 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+# API history ranges are snapped to this grid so that every rerun and every session
+# inside the same bucket builds identical `start`/`end` strings (and cache keys).
+DEFAULT_BUCKET = timedelta(minutes=int(os.getenv("TIME_WINDOW_BUCKET_MINUTES", "10")))
+
+def isoformat_z(t: datetime) -> str:
+    """Formats a UTC datetime the way the Kamino API expects (ms precision, Z suffix)."""
+    return t.astimezone(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+def floor_to_bucket(t: datetime, bucket: timedelta = DEFAULT_BUCKET) -> datetime:
+    """Rounds `t` down to the start of its bucket."""
+    epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    return epoch + ((t - epoch) // bucket) * bucket
+
+def snapped_window(days: int, bucket: timedelta = DEFAULT_BUCKET, now: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """
+    Returns a (start, end) window of `days` ending at the end of the current bucket.
+    `end` is rounded up so the newest data points are always inside the window.
+    """
+    now = now or datetime.now(timezone.utc)
+    end = floor_to_bucket(now, bucket) + bucket
+    return end - timedelta(days=days), end
+
+def snapped_window_strings(days: int, bucket: timedelta = DEFAULT_BUCKET, now: Optional[datetime] = None) -> Tuple[str, str]:
+    """Same as `snapped_window`, formatted as API query strings."""
+    start, end = snapped_window(days, bucket, now)
+    return isoformat_z(start), isoformat_z(end)
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+SYMBOLS = ["SOL", "USDC", "JitoSOL", "cbBTC", "PYUSD"]
+
+def make_positions(n: int = 400, seed: int = 0) -> pd.DataFrame:
+    """Synthetic liquidation risk frame shaped like `get_liquidation_risk_data` output."""
+    rng = np.random.default_rng(seed)
+    supply_symbol = rng.choice(SYMBOLS, n).astype(object)
+    borrow_symbol = rng.choice(SYMBOLS, n).astype(object)
+    supply = rng.uniform(1e3, 1e6, n)
+    borrow = supply * rng.uniform(0.2, 1.1, n)
+    lt = rng.choice([0.65, 0.75, 0.85], n)
+    bf = rng.choice([1.0, 1.0, 1.25], n)
+    hf = (supply * lt) / (borrow * bf)
+    df = pd.DataFrame({
+        "obligation_id": [f"obl_{i}" for i in range(n)],
+        "supply_symbol": supply_symbol,
+        "borrow_symbol": borrow_symbol,
+        "supply_value": supply,
+        "borrow_value": borrow,
+        "supply_lt": lt,
+        "borrow_factor": bf,
+        "borrow_liquidation_price_shock": hf - 1,
+        "collateral_liquidation_price_shock": 1 - 1 / hf,
+    })
+    # Collateral-only and debt-only positions have no liquidation shock
+    empty = rng.random(n) < 0.05
+    df.loc[empty, ["borrow_liquidation_price_shock", "collateral_liquidation_price_shock"]] = np.nan
+    return df
+
+@pytest.fixture
+def positions() -> pd.DataFrame:
+    return make_positions()
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+from src.asof import asof_lookup, asof_value
+
+def _reference(df: pd.DataFrame, columns: list, horizons: tuple) -> dict:
+    """Boolean scan per horizon: the last row (in input order among ties) at or before latest - days."""
+    ts = pd.to_datetime(df["timestamp"])
+    latest = ts.max()
+    result = {}
+    for days in horizons:
+        target = latest - pd.Timedelta(days=days)
+        eligible = ts[ts <= target]
+        if eligible.empty:
+            result[days] = None
+            continue
+        pos = np.flatnonzero((ts == eligible.max()).to_numpy())[-1]
+        result[days] = df[columns].iloc[pos].to_dict()
+    return result
+
+def test_matches_boolean_scan():
+    rng = np.random.default_rng(1)
+    start = pd.Timestamp("2026-01-01")
+    # Unsorted, with duplicate timestamps and missing ones
+    hours = rng.integers(0, 60 * 24, size=500)
+    ts = pd.Series(start + pd.to_timedelta(hours, unit="h"))
+    ts[rng.choice(500, size=20, replace=False)] = pd.NaT
+    df = pd.DataFrame({"timestamp": ts, "tvl": rng.uniform(0, 1e6, 500), "apy": rng.uniform(0, 0.2, 500)})
+    horizons = (0, 1, 7, 30, 59, 60, 90)
+
+    result = asof_lookup(df, ["tvl", "apy"], horizons)
+    assert result == _reference(df.dropna(subset=["timestamp"]), ["tvl", "apy"], horizons)
+    assert result[90] is None
+
+def test_sorted_input():
+    df = pd.DataFrame({
+        "timestamp": pd.date_range("2026-01-01", periods=40, freq="D"),
+        "tvl": np.arange(40, dtype="float64"),
+    })
+    result = asof_lookup(df, ["tvl"])
+    assert [asof_value(result, d, "tvl") for d in (0, 1, 7, 30)] == [39.0, 38.0, 32.0, 9.0]
+
+def test_empty_and_all_missing():
+    assert asof_lookup(pd.DataFrame(columns=["timestamp", "tvl"]), ["tvl"], (0, 1)) == {0: None, 1: None}
+    df = pd.DataFrame({"timestamp": [pd.NaT, pd.NaT], "tvl": [1.0, 2.0]})
+    assert asof_lookup(df, ["tvl"], (0, 1)) == {0: None, 1: None}
+    assert asof_value({0: None}, 0, "tvl") is None
@@ -0,0 +1,26 @@
+import pandas as pd
+import pytest
+from src.cache import _is_empty
+
+FULL = pd.DataFrame({"a": [1]})
+EMPTY = pd.DataFrame()
+
+@pytest.mark.parametrize("value, empty", [
+    (None, True),
+    (EMPTY, True),
+    (FULL, False),
+    ([], True),
+    ([1], False),
+    ({}, True),
+    ({"history": []}, True),
+    ({"history": [{"timestamp": "2026-01-01"}]}, False),
+    # Batch loaders: a dict or tuple whose frames all came back empty is a failed load
+    ({("m", "r1"): EMPTY, ("m", "r2"): EMPTY}, True),
+    ({("m", "r1"): EMPTY, ("m", "r2"): FULL}, False),
+    ((123, EMPTY, EMPTY), True),
+    ((123, EMPTY, FULL), False),
+    ({"symbol": "USDC"}, False),
+    (0.0, False),
+])
+def test_is_empty(value, empty):
+    assert _is_empty(value) is empty
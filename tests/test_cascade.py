@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.cascade import cascade_grid, IMPACT_MODELS, CLOSE_FACTOR, LIQUIDATION_BONUS
+
+SHOCKS = (0.0, 0.05, 0.1, 0.2, 0.3, 0.45)
+
+def _brute_cascade(df, symbol, shock0, impact, depth, max_iterations):
+    """Iterates the fixed point position by position for one symbol and initial shock."""
+    d = df[df["borrow_liquidation_price_shock"].notna()]
+    d = d[(d["supply_symbol"] == symbol) & (d["borrow_symbol"] != symbol)]
+    hf = (1 + d["borrow_liquidation_price_shock"].to_numpy()).clip(0)
+    borrow = d["borrow_value"].to_numpy()
+    seized = np.minimum(CLOSE_FACTOR * (1 + LIQUIDATION_BONUS) * borrow, d["supply_value"].to_numpy())
+
+    shock = shock0
+    liquidated = hf <= 1 / (1 - shock)
+    initial_debt = borrow[liquidated].sum()
+    iterations, converged = 0, False
+    for _ in range(max_iterations):
+        shock = 1 - (1 - shock0) * (1 - IMPACT_MODELS[impact](seized[liquidated].sum(), depth))
+        now = hf <= 1 / (1 - shock)
+        converged = bool((now == liquidated).all())
+        liquidated = now
+        if converged:
+            break
+        iterations += 1
+    return initial_debt, borrow[liquidated].sum(), shock, iterations, converged
+
+@pytest.mark.parametrize("impact, depth", [("linear", 1e6), ("linear", 2e5), ("sqrt", 1e6)])
+def test_matches_brute_force(positions, impact, depth):
+    result = cascade_grid(positions, SHOCKS, impact=impact, depth=depth)
+    assert result["symbols"] == sorted(positions["supply_symbol"].unique())
+    for i, symbol in enumerate(result["symbols"]):
+        for j, shock in enumerate(SHOCKS):
+            initial, final, final_shock, iterations, converged = _brute_cascade(positions, symbol, shock, impact, depth, 100)
+            assert result["initial_debt"][i, j] == pytest.approx(initial, rel=1e-9)
+            assert result["final_debt"][i, j] == pytest.approx(final, rel=1e-9)
+            assert result["final_shock"][i, j] == pytest.approx(final_shock, rel=1e-12)
+            assert result["iterations"][i, j] == iterations
+            assert result["converged"][i, j] == converged
+    assert result["converged"].all()
+    assert (result["final_debt"] >= result["initial_debt"]).all()
+
+def test_consistent_when_iterations_run_out(positions):
+    # A thin market keeps the cascade going past a single iteration
+    result = cascade_grid(positions, SHOCKS, depth=5e4, max_iterations=1)
+    assert not result["converged"].all()
+    for i, symbol in enumerate(result["symbols"]):
+        for j, shock in enumerate(SHOCKS):
+            _, final, final_shock, _, converged = _brute_cascade(positions, symbol, shock, "linear", 5e4, 1)
+            assert result["converged"][i, j] == converged
+            assert result["final_shock"][i, j] == pytest.approx(final_shock, rel=1e-12)
+            # Reported debt is what is liquidatable at the reported shock
+            assert result["final_debt"][i, j] == pytest.approx(final, rel=1e-9)
+
+def test_same_asset_positions_are_unaffected(positions):
+    positions["borrow_symbol"] = positions["supply_symbol"]
+    result = cascade_grid(positions, SHOCKS)
+    assert result["symbols"] == []
+    assert result["final_debt"].shape == (0, len(SHOCKS))
+
+def test_huge_hf_stays_in_its_own_symbol():
+    # A dust borrow gives an HF whose hf / (1 + hf) rounds to 1.0 in float64, the float
+    # key of the next symbol's first position; neither symbol is ever liquidated here
+    df = pd.DataFrame({
+        "supply_symbol": ["A", "B"],
+        "borrow_symbol": ["USDC", "USDC"],
+        "supply_value": [5e6, 1e3],
+        "borrow_value": [1e-10, 1.0],
+        "borrow_liquidation_price_shock": [5e6 * 0.8 / 1e-10 - 1, 99.0],
+    })
+    result = cascade_grid(df, SHOCKS)
+    assert result["symbols"] == ["A", "B"]
+    assert (result["initial_debt"] == 0).all()
+    assert (result["final_debt"] == 0).all()
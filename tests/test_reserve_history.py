@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+from src.reserve_history import parse_reserve_history, HISTORY_COLUMNS, NUMERIC_METRIC_FIELDS, DEFAULT_DECIMALS
+
+def _entry(timestamp, **metrics):
+    return {"timestamp": timestamp, "metrics": {"symbol": "USDC", "borrowCurve": [[0, 0]], **metrics}}
+
+def _reference(history: list) -> pd.DataFrame:
+    """Row-by-row parse, one field at a time: what the vectorized parser must reproduce."""
+    rows = []
+    for h in history:
+        m = h.get("metrics") or {}
+        row = {"timestamp": pd.to_datetime(h.get("timestamp"), errors="coerce", utc=True)}
+        row["symbol"] = m.get("symbol")
+        row["borrowCurve"] = m.get("borrowCurve")
+        for f in NUMERIC_METRIC_FIELDS:
+            row[f] = pd.to_numeric(pd.Series([m.get(f)], dtype=object), errors="coerce").astype("float64").iloc[0]
+        rows.append(row)
+    df = pd.DataFrame(rows, columns=HISTORY_COLUMNS)
+    for f in ["symbol", "borrowCurve"]:
+        df[f] = pd.Series([r[f] for r in rows], dtype=object)
+    decimals = df["decimals"].ffill().bfill().fillna(DEFAULT_DECIMALS)
+    for f in ["reserveDepositLimit", "reserveBorrowLimit"]:
+        df[f] = df[f] / 10.0 ** decimals
+    return df.sort_values("timestamp", kind="stable").reset_index(drop=True)
+
+def _assert_same(df: pd.DataFrame, expected: pd.DataFrame):
+    assert list(df.columns) == HISTORY_COLUMNS
+    assert list(df["timestamp"]) == list(expected["timestamp"])
+    assert list(df["symbol"]) == list(expected["symbol"])
+    assert list(df["borrowCurve"]) == list(expected["borrowCurve"])
+    for f in NUMERIC_METRIC_FIELDS:
+        assert df[f].dtype == "float64", f
+        np.testing.assert_allclose(df[f].to_numpy(), expected[f].to_numpy(), rtol=1e-12, err_msg=f)
+
+def test_empty_history_has_schema():
+    df = parse_reserve_history([])
+    assert df.empty
+    assert list(df.columns) == HISTORY_COLUMNS
+
+def test_matches_row_by_row_parse():
+    rng = np.random.default_rng(0)
+    start = pd.Timestamp("2026-01-01", tz="UTC")
+    history = []
+    for i in rng.permutation(200):
+        metrics = {f: str(rng.uniform(0, 1e9)) if i % 3 else float(rng.uniform(0, 1e9)) for f in NUMERIC_METRIC_FIELDS}
+        metrics["decimals"] = [6, 9, None][i % 3]
+        history.append(_entry((start + pd.Timedelta(hours=int(i))).strftime("%Y-%m-%dT%H:%M:%S.000Z"), **metrics))
+    _assert_same(parse_reserve_history(history), _reference(history))
+
+def test_non_numeric_and_missing_values():
+    history = [
+        _entry("2026-01-02T00:00:00.000Z", borrowTvl="n/a", reserveDepositLimit="1000000000"),
+        {"timestamp": "2026-01-01T00:00:00.000Z", "metrics": None},
+        _entry("not a date", depositTvl="12.5", decimals=9, reserveBorrowLimit=5e9),
+    ]
+    df = parse_reserve_history(history)
+    _assert_same(df, _reference(history))
+    assert np.isnan(df.loc[df["symbol"].notna() & df["timestamp"].notna(), "borrowTvl"]).all()
+    # Decimals are back-filled from the only row reporting them
+    assert df["reserveDepositLimit"].dropna().tolist() == [1.0]
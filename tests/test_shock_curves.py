@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.shock_curves import build_liquidation_curves, CURVE_COLUMNS
+
+def _groupby_curve(df: pd.DataFrame, symbol_col: str, shock_col: str, symbols: list, adjust: bool) -> pd.DataFrame:
+    """The per-selection groupby/cumsum the liquidation risk page used to run."""
+    d = df[df[symbol_col].isin(symbols)].dropna(subset=[shock_col]).copy()
+    d["shock_rounded"] = d[shock_col].round(4)
+    if adjust and symbol_col == "supply_symbol":
+        d["supply_value"] = d["supply_value"] * (1 - d["shock_rounded"])
+    elif adjust:
+        d["borrow_value"] = d["borrow_value"] * (1 + d["shock_rounded"])
+    agg = d.groupby("shock_rounded")[["supply_value", "borrow_value"]].sum().sort_index()
+    agg["cumulative_borrow_value"] = agg["borrow_value"].cumsum()
+    agg["cumulative_supply_value"] = agg["supply_value"].cumsum()
+    return agg.reset_index()[CURVE_COLUMNS]
+
+SELECTIONS = [["SOL"], ["USDC"], ["SOL", "USDC"], ["JitoSOL", "cbBTC", "PYUSD"], ["SOL", "USDC", "JitoSOL", "cbBTC", "PYUSD"], ["SOL", "missing"]]
+
+@pytest.mark.parametrize("adjust", [False, True])
+@pytest.mark.parametrize("selection", SELECTIONS)
+def test_matches_groupby(positions, selection, adjust):
+    # Coarse shocks make rounded buckets collide across positions and symbols
+    positions["collateral_liquidation_price_shock"] = positions["collateral_liquidation_price_shock"].round(3)
+    positions["borrow_liquidation_price_shock"] = positions["borrow_liquidation_price_shock"].round(3)
+    supply_curves, borrow_curves = build_liquidation_curves(positions)
+    for curves, symbol_col, shock_col in [
+        (supply_curves, "supply_symbol", "collateral_liquidation_price_shock"),
+        (borrow_curves, "borrow_symbol", "borrow_liquidation_price_shock"),
+    ]:
+        result = curves.curve(selection, adjust=adjust)
+        expected = _groupby_curve(positions, symbol_col, shock_col, selection, adjust)
+        assert list(result.columns) == CURVE_COLUMNS
+        np.testing.assert_array_equal(result["shock_rounded"].to_numpy(), expected["shock_rounded"].to_numpy())
+        for column in CURVE_COLUMNS[1:]:
+            np.testing.assert_allclose(result[column].to_numpy(), expected[column].to_numpy(), rtol=1e-9)
+
+def test_symbols_and_empty_selection(positions):
+    supply_curves, borrow_curves = build_liquidation_curves(positions)
+    assert supply_curves.symbols == sorted(positions["supply_symbol"].unique())
+    assert borrow_curves.symbols == sorted(positions["borrow_symbol"].unique())
+    assert supply_curves.curve([]).empty
+    assert list(supply_curves.curve(["missing"]).columns) == CURVE_COLUMNS
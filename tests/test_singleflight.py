@@ -0,0 +1,132 @@
+import time
+import threading
+import pandas as pd
+from src.singleflight import SingleFlight, single_flight
+
+def _wait_for_followers(group: SingleFlight, key, count: int):
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        with group._lock:
+            entry = group._calls.get(key)
+            if entry is not None and entry[2] == count:
+                return
+        time.sleep(0.001)
+    raise AssertionError(f"{count} followers never joined {key!r}")
+
+def _run_concurrently(group: SingleFlight, key, func, callers: int) -> list:
+    """Starts `callers` threads on the same key once the first one is running `func`."""
+    results = [None] * callers
+
+    def call(i):
+        try:
+            results[i] = group.do(key, func)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=call, args=(0,))]
+    threads[0].start()
+    func.started.wait(5)
+    for i in range(1, callers):
+        threads.append(threading.Thread(target=call, args=(i,)))
+        threads[-1].start()
+    _wait_for_followers(group, key, callers - 1)
+    func.release.set()
+    for t in threads:
+        t.join(5)
+    return results
+
+class _Blocking:
+    """Callable that blocks until released and counts its executions."""
+
+    def __init__(self, result=None, error=None):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = 0
+        self.result = result if result is not None else object()
+        self.error = error
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+def test_concurrent_calls_run_once():
+    group = SingleFlight()
+    func = _Blocking()
+    results = _run_concurrently(group, "key", func, callers=8)
+    assert func.calls == 1
+    assert all(r == (func.result, True) for r in results)
+    assert group._calls == {}
+
+def test_sequential_calls_are_not_shared():
+    group = SingleFlight()
+    calls = []
+    for _ in range(3):
+        assert group.do("key", lambda: calls.append(1) or len(calls)) == (len(calls), False)
+    assert len(calls) == 3
+
+def test_distinct_keys_do_not_coalesce():
+    group = SingleFlight()
+    a, b = _Blocking(), _Blocking()
+    threads = [threading.Thread(target=group.do, args=(k, f)) for k, f in (("a", a), ("b", b))]
+    for t in threads:
+        t.start()
+    assert a.started.wait(5) and b.started.wait(5)
+    a.release.set()
+    b.release.set()
+    for t in threads:
+        t.join(5)
+    assert (a.calls, b.calls) == (1, 1)
+
+def test_error_reaches_every_caller():
+    group = SingleFlight()
+    func = _Blocking(error=ValueError("boom"))
+    results = _run_concurrently(group, "key", func, callers=4)
+    assert func.calls == 1
+    assert all(isinstance(r, ValueError) for r in results)
+    assert group._calls == {}
+
+def test_reentrant_call_runs_inline():
+    group = SingleFlight()
+    assert group.do("key", lambda: group.do("key", lambda: 42)) == ((42, False), False)
+
+def test_decorator_copies_shared_frames():
+    func = _Blocking(result=pd.DataFrame({"a": [1, 2]}))
+
+    @single_flight()
+    def load():
+        return func()
+
+    results = [None] * 3
+
+    def call(i):
+        results[i] = load()
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(3)]
+    threads[0].start()
+    func.started.wait(5)
+    for t in threads[1:]:
+        t.start()
+    # Followers are parked on the leader's future; give them time to join
+    time.sleep(0.2)
+    func.release.set()
+    for t in threads:
+        t.join(5)
+    assert func.calls == 1
+    assert all(r.equals(func.result) for r in results)
+    assert len({id(r) for r in results}) == 3
+
+def test_decorator_skips_unhashable_arguments():
+    calls = []
+
+    @single_flight()
+    def load(value):
+        calls.append(value)
+        return len(calls)
+
+    assert load({"a": [1, 2]}) == 1
+    # bytearray cannot be a key: the call runs uncoalesced instead of failing
+    assert load(bytearray(b"x")) == 2
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+from src.database import reduce_sum, reduce_groupby_sum, iter_cumulative
+
+def _frame(n: int = 1000, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "timestamp": np.sort(rng.integers(0, 10_000, n)),
+        "supply_symbol": rng.choice(["SOL", "USDC", "PYUSD"], n),
+        "borrow_symbol": rng.choice(["SOL", "USDC", None], n),
+        "supply_value": rng.uniform(0, 1e6, n),
+        "borrow_value": rng.uniform(0, 1e6, n),
+    })
+
+def _chunks(df: pd.DataFrame, size: int):
+    """What iter_query yields: consecutive slices, possibly with empty ones in between."""
+    for start in range(0, len(df), size):
+        yield df.iloc[start:start + size]
+        yield df.iloc[0:0]
+
+def test_reduce_sum():
+    df = _frame()
+    total = reduce_sum(_chunks(df, 97), ["supply_value", "borrow_value"])
+    np.testing.assert_allclose(total.to_numpy(), df[["supply_value", "borrow_value"]].sum().to_numpy(), rtol=1e-12)
+    assert reduce_sum(iter([]), ["supply_value"]).tolist() == [0.0]
+
+def test_reduce_groupby_sum():
+    df = _frame()
+    by, columns = ["supply_symbol", "borrow_symbol"], ["supply_value", "borrow_value"]
+    result = reduce_groupby_sum(_chunks(df, 97), by, columns).sort_values(by).reset_index(drop=True)
+    expected = df.groupby(by, dropna=False)[columns].sum().reset_index().sort_values(by).reset_index(drop=True)
+    pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-12)
+    assert list(reduce_groupby_sum(iter([]), by, columns).columns) == by + columns
+
+def test_iter_cumulative():
+    df = _frame()
+    result = pd.concat(iter_cumulative(_chunks(df, 97), "supply_value"))
+    np.testing.assert_allclose(result["cumulative_supply_value"].to_numpy(), df["supply_value"].cumsum().to_numpy(), rtol=1e-12)
+
+    grouped = pd.concat(iter_cumulative(_chunks(df, 97), "borrow_value", by="supply_symbol", out="running"))
+    expected = df.groupby("supply_symbol")["borrow_value"].cumsum()
+    np.testing.assert_allclose(grouped["running"].to_numpy(), expected.to_numpy(), rtol=1e-12)
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.stress import stress_grid, sensitivity_matrix, SENSITIVITY_SHOCKS
+
+def _brute_stress(df, supply_symbols, borrow_symbols, c, s):
+    """Per scenario, re-evaluate every position's shocked HF."""
+    d = df[df["borrow_liquidation_price_shock"].notna()]
+    hf0 = 1 + d["borrow_liquidation_price_shock"].to_numpy()
+    hit_c = np.ones(len(d), bool) if supply_symbols is None else d["supply_symbol"].isin(supply_symbols).to_numpy()
+    hit_d = np.ones(len(d), bool) if borrow_symbols is None else d["borrow_symbol"].isin(borrow_symbols).to_numpy()
+    collateral = np.zeros((len(s), len(c)))
+    debt = np.zeros((len(s), len(c)))
+    for i, debt_shock in enumerate(s):
+        for j, collateral_shock in enumerate(c):
+            hf = hf0 * np.where(hit_c, 1 - collateral_shock, 1.0) / np.where(hit_d, 1 + debt_shock, 1.0)
+            liquidatable = hf <= 1
+            collateral[i, j] = d["supply_value"].to_numpy()[liquidatable].sum()
+            debt[i, j] = d["borrow_value"].to_numpy()[liquidatable].sum()
+    return collateral, debt
+
+@pytest.mark.parametrize("supply_symbols, borrow_symbols", [
+    (None, None),
+    (["SOL", "JitoSOL"], None),
+    (None, ["USDC", "PYUSD"]),
+    (["SOL", "JitoSOL"], ["USDC", "SOL"]),
+    (["missing"], ["missing"]),
+])
+def test_stress_grid_matches_brute_force(positions, supply_symbols, borrow_symbols):
+    grid = stress_grid(positions, supply_symbols, borrow_symbols, points=21)
+    collateral, debt = _brute_stress(positions, supply_symbols, borrow_symbols, grid["collateral_shocks"], grid["debt_shocks"])
+    assert grid["collateral"].shape == (21, 21)
+    np.testing.assert_allclose(grid["collateral"], collateral, rtol=1e-9)
+    np.testing.assert_allclose(grid["debt"], debt, rtol=1e-9)
+
+def _brute_sensitivity(df, shocks):
+    """Per asset and shock, move that one price and count the positions that newly cross HF <= 1."""
+    supply, borrow = df["supply_value"].to_numpy(), df["borrow_value"].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hf0 = (supply * df["supply_lt"].to_numpy()) / (borrow * df["borrow_factor"].to_numpy())
+    healthy = np.isfinite(hf0) & (hf0 > 1) & (borrow > 0)
+    symbols = sorted(set(df["supply_symbol"].dropna()) | set(df["borrow_symbol"].dropna()))
+    result = pd.DataFrame(0.0, index=pd.Index(symbols, name="symbol"), columns=np.asarray(shocks, dtype="float64"))
+    for symbol in symbols:
+        as_supply = (df["supply_symbol"] == symbol).to_numpy()
+        as_borrow = (df["borrow_symbol"] == symbol).to_numpy()
+        for shock in result.columns:
+            factor = np.where(as_supply, 1 + shock, 1.0) / np.where(as_borrow, 1 + shock, 1.0)
+            newly = healthy & (hf0 * factor <= 1)
+            result.loc[symbol, shock] = borrow[newly].sum()
+    return result
+
+def test_sensitivity_matrix_matches_brute_force(positions):
+    # A few positions that are already liquidatable, or have no debt, must never count
+    positions.loc[:9, "borrow_value"] = positions.loc[:9, "supply_value"] * 2
+    positions.loc[10:14, "borrow_value"] = 0.0
+    result = sensitivity_matrix(positions)
+    expected = _brute_sensitivity(positions, SENSITIVITY_SHOCKS)
+    assert list(result.index) == list(expected.index)
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy(), rtol=1e-9)
+    assert (result[0.0] == 0).all()
+
+def test_sensitivity_matrix_keeps_huge_hf_in_its_own_segment(positions):
+    # A dust borrow gives an HF whose hf / (1 + hf) rounds to 1.0 in float64
+    dust = positions.iloc[[0]].assign(supply_symbol="JitoSOL", borrow_symbol="USDC", supply_value=5e6, borrow_value=1e-10)
+    positions = pd.concat([positions, dust], ignore_index=True)
+    result = sensitivity_matrix(positions)
+    expected = _brute_sensitivity(positions, SENSITIVITY_SHOCKS)
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy(), rtol=1e-9)
+
+def test_stress_grid_from_market_positions(positions):
+    # Market positions carry no shock column; HF0 comes from values, supply_lt and borrow_factor
+    positions = positions[positions["borrow_liquidation_price_shock"].notna()]
+    market = positions.drop(columns=["borrow_liquidation_price_shock", "collateral_liquidation_price_shock"])
+    market = pd.concat([market, market.iloc[[0]].assign(borrow_value=0.0)], ignore_index=True)
+    for supply_symbols, borrow_symbols in [(None, None), (["SOL"], ["USDC"])]:
+        expected = stress_grid(positions, supply_symbols, borrow_symbols, points=21)
+        result = stress_grid(market, supply_symbols, borrow_symbols, points=21)
+        np.testing.assert_allclose(result["collateral"], expected["collateral"], rtol=1e-9)
+        np.testing.assert_allclose(result["debt"], expected["debt"], rtol=1e-9)